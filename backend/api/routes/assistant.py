@@ -1,8 +1,26 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
+from backend.api.routes.attendance import attendance_service
+from backend.config import settings
+from backend.services.assistant import AssistantService, OpenAIChatClient
 
 router = APIRouter()
 
+# Questions the local intent parser cannot answer go to the model, if one is configured
+assistant_service = AssistantService(
+    attendance_service.presence,
+    llm_client=OpenAIChatClient() if settings.OPENAI_API_KEY else None,
+    cache_ttl=settings.ASSISTANT_CACHE_TTL
+)
+
 @router.get("/assist")
-async def assist():
-    # Implement assistant logic here
-    pass 
\ No newline at end of file
+async def assist(question: str = Query(..., min_length=1, description="Question about attendance")):
+    """Answer an attendance question, locally where possible"""
+    try:
+        return {"status": "success", "data": await assistant_service.answer(question)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+async def assistant_stats():
+    """How many questions were answered locally, from cache or by the model"""
+    return {"status": "success", "data": assistant_service.get_stats()}
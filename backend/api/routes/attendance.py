@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, Body, Query, Request
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, Optional
 import json
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
 from datetime import datetime, date, timedelta
 from ...services.attendance import AttendanceService
+from ...services.admission import AdmissionController, Overloaded
 from ...services.face_recognition import FaceRecognitionService
+from ...services.ingestion import DetectionRecorder, IngestionService
 from ...config import settings
-from backend.models import SessionLocal, User, FaceEmbedding, AttendanceRecord
+from backend.models import SessionLocal, User, FaceEmbedding
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from sqlalchemy import text
 
 router = APIRouter()
@@ -20,6 +24,47 @@ face_recognition_service = FaceRecognitionService(
     settings.FACE_DETECTION_MODEL_PATH
 )
 attendance_service = AttendanceService()
+# API requests and camera ingestion share one detector. The YOLO model is not
+# safe to call from several threads, so it runs one call at a time and every
+# caller goes through the admission controller
+admission_controller = AdmissionController(
+    max_in_flight=1,
+    max_queue=settings.DETECT_MAX_QUEUE,
+    deadline=settings.DETECT_DEADLINE_SECONDS,
+    client_rate=settings.DETECT_CLIENT_RATE,
+    client_burst=settings.DETECT_CLIENT_BURST,
+    executor=ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector")
+)
+ingestion_service = IngestionService(
+    face_recognition_service,
+    max_fps=settings.CAMERA_MAX_FPS,
+    max_frame_age=settings.CAMERA_MAX_FRAME_AGE,
+    on_result=DetectionRecorder(attendance_service, settings.CAMERA_SNAPSHOT_INTERVAL),
+    admission=admission_controller
+)
+
+# Row shape of the /all query, used for records read back from the archive
+ArchivedRow = namedtuple("ArchivedRow", ["id", "user_id", "name", "timestamp", "confidence"])
+
+def _parse_timestamp(value):
+    """Raw SQL returns SQLite timestamps as strings"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+    return value
+
+def _archived_before(start_date):
+    """Cut-off of an open-ended query that was served from the hot table only.
+
+    Records older than this are archived and were left out; pass a start_date
+    at or before it to include them.
+    """
+    if start_date is not None:
+        return None
+    horizon = attendance_service.archive.horizon()
+    return horizon.isoformat() if horizon else None
 
 class RegisterFaceRequest(BaseModel):
     student_id: int
@@ -30,6 +75,23 @@ class RecordAttendanceRequest(BaseModel):
     user_id: str
     confidence: float
 
+class IngestEventRequest(BaseModel):
+    event_id: str = Field(..., pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    camera_id: str = Field(..., pattern=r"^[A-Za-z0-9_-]{1,64}$")
+    timestamp: datetime
+    user_id: Optional[int] = None
+    confidence: Optional[float] = None
+    snapshot: Optional[str] = None  # base64-encoded JPEG
+
+    @model_validator(mode="after")
+    def check_confidence(self):
+        if self.user_id is not None and self.confidence is None:
+            raise ValueError("confidence is required when user_id is set")
+        return self
+
+class IngestBatchRequest(BaseModel):
+    events: List[IngestEventRequest] = Field(..., min_length=1, max_length=settings.INGEST_MAX_BATCH)
+
 @router.post("/register")
 async def register_face(request: RegisterFaceRequest):
     """Register a new face for attendance"""
@@ -68,27 +130,48 @@ async def register_face(request: RegisterFaceRequest):
     finally:
         db.close()
 
+@router.post("/ingest")
+async def ingest_events(request: IngestBatchRequest):
+    """Ingest a batch of edge events idempotently, keyed by client event IDs"""
+    try:
+        return attendance_service.ingest_events([event.model_dump() for event in request.events])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.websocket("/ws/attendance")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time attendance"""
     await websocket.accept()
+    # Keyed by host like HTTP clients, so reconnecting does not refill the bucket
+    client_id = websocket.client.host if websocket.client else "unknown"
     try:
         while True:
             # Receive frame data
             data = await websocket.receive_text()
             frame_data = json.loads(data)
             
-            # Process frame for face detection and recognition
-            results = face_recognition_service.process_frame(frame_data)
+            # Process frame for face detection and recognition, dropping it under overload
+            try:
+                results = await admission_controller.run(
+                    client_id, face_recognition_service.process_frame, frame_data
+                )
+            except Overloaded as e:
+                await websocket.send_json({
+                    "dropped": True,
+                    "reason": e.reason,
+                    "retry_after": round(e.retry_after, 2)
+                })
+                continue
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
             
             # Record attendance for recognized faces
             for identity, _, confidence in results:
                 if identity and confidence > 0.7:
-                    attendance_service.record_attendance(
-                        identity,
-                        datetime.now(),
-                        confidence
-                    )
+                    attendance_service.record_attendance(int(identity), confidence)
             
             # Send results back to client
             await websocket.send_json({
@@ -119,7 +202,8 @@ async def get_attendance_history(
         )
         return {
             "status": "success",
-            "data": history
+            "data": history,
+            "archived_before": _archived_before(start_date)
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -137,17 +221,29 @@ async def get_attendance_stats():
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/detect_faces")
-async def detect_faces(image_base64: str = Body(..., embed=True)):
+async def detect_faces(request: Request, image_base64: str = Body(..., embed=True)):
     """Detect faces in a base64-encoded image and return bounding boxes"""
+    client_id = request.client.host if request.client else "unknown"
     try:
-        boxes = face_recognition_service.detect_faces(image_base64)
+        boxes = await admission_controller.run(client_id, face_recognition_service.detect_faces, image_base64)
         return {"boxes": boxes}
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/admission_stats")
+async def get_admission_stats():
+    """Queue depth and load-shedding counters of the face detector"""
+    return {"status": "success", "data": admission_controller.get_stats()}
+
 @router.get("/all")
-async def get_all_attendance():
-    """Get all attendance records for all users"""
+async def get_all_attendance(start_date: datetime = None, end_date: datetime = None):
+    """Get all attendance records for all users.
+
+    Without start_date only the hot table (the retention horizon) is returned;
+    archived months are merged in when start_date reaches back into them.
+    """
     db = SessionLocal()
     try:
         # Join AttendanceRecord and User tables
@@ -156,22 +252,34 @@ async def get_all_attendance():
             SELECT ar.id, ar.user_id, u.name, ar.timestamp, ar.confidence
             FROM attendance_records ar
             JOIN users u ON ar.user_id = u.id
+            WHERE (:start IS NULL OR ar.timestamp >= :start)
+              AND (:end IS NULL OR ar.timestamp <= :end)
             ORDER BY ar.timestamp DESC
-            """)
+            """),
+            # Bound as text in SQLite's stored timestamp format
+            {
+                "start": start_date.isoformat(" ") if start_date else None,
+                "end": end_date.isoformat(" ") if end_date else None
+            }
         ).fetchall()
+        archived = attendance_service.archive.read(start_date, end_date) if start_date else []
+        if archived:
+            hot_ids = {r.id for r in records}
+            # Merge archived months back in, keeping the JOIN semantics
+            names = dict(db.query(User.id, User.name).all())
+            records = list(records) + [
+                ArchivedRow(r.id, r.user_id, names[r.user_id], r.timestamp, r.confidence)
+                for r in archived
+                if r.user_id in names and r.id not in hot_ids
+            ]
+            records.sort(key=lambda r: _parse_timestamp(r.timestamp) or datetime.min, reverse=True)
         result = []
         for r in records:
             # Determine status based on confidence or other logic
             status = "PRESENT" if r.confidence >= 0.9 else ("LATE" if r.confidence >= 0.7 else "ABSENT")
             # Fix: parse string timestamp to datetime if needed
             if r.timestamp:
-                if isinstance(r.timestamp, str):
-                    try:
-                        dt = datetime.fromisoformat(r.timestamp)
-                    except ValueError:
-                        dt = datetime.strptime(r.timestamp, "%Y-%m-%d %H:%M:%S.%f")
-                else:
-                    dt = r.timestamp
+                dt = _parse_timestamp(r.timestamp)
                 time_str = dt.strftime("%H:%M:%S")
                 date_str = dt.strftime("%Y-%m-%d")
             else:
@@ -185,7 +293,7 @@ async def get_all_attendance():
                 "time": time_str,
                 "status": status
             })
-        return {"status": "success", "data": result}
+        return {"status": "success", "data": result, "archived_before": _archived_before(start_date)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     finally:
@@ -203,6 +311,11 @@ async def record_attendance_endpoint(request: RecordAttendanceRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cameras")
+async def get_camera_stats():
+    """Health and throughput statistics of the camera ingestion service"""
+    return {"status": "success", "data": ingestion_service.get_stats()}
+
 @router.get("/students")
 async def get_all_students():
     db = SessionLocal()
@@ -226,25 +339,11 @@ async def get_dashboard_stats():
     try:
         total_students = db.query(User).count()
         today = date.today()
-        today_start = datetime.combine(today, datetime.min.time())
-        today_end = datetime.combine(today, datetime.max.time())
-
-        # Get all attendance records for today
-        records_today = db.query(AttendanceRecord).filter(
-            AttendanceRecord.timestamp >= today_start,
-            AttendanceRecord.timestamp <= today_end
-        ).all()
-
-        present_ids = set()
-        late_ids = set()
-        for record in records_today:
-            if record.confidence >= 0.9:
-                present_ids.add(record.user_id)
-            elif record.confidence >= 0.7:
-                late_ids.add(record.user_id)
-
-        present_today = len(present_ids)
-        late_today = len(late_ids)
+
+        # Distinct students seen today, from the presence bitmaps
+        presence = attendance_service.presence
+        present_today = presence.count(today, today, ["present"])
+        late_today = presence.count(today, today, ["late"])
         absent_today = total_students - present_today
 
         return {
@@ -278,31 +377,14 @@ async def attendance_report(
         else:
             start_date = date(1970, 1, 1)  # all time
 
-        records = db.query(AttendanceRecord).filter(
-            AttendanceRecord.timestamp >= start_date
-        ).all()
-
         total_students = db.query(User).count()
-        present_ids = set()
-        late_ids = set()
-        # For trends
-        trends = {}
-
-        for record in records:
-            day = record.timestamp.date().isoformat()
-            if day not in trends:
-                trends[day] = {"present": 0, "late": 0, "absent": 0}
-            if record.confidence >= 0.9:
-                present_ids.add(record.user_id)
-                trends[day]["present"] += 1
-            elif record.confidence >= 0.7:
-                late_ids.add(record.user_id)
-                trends[day]["late"] += 1
-            else:
-                trends[day]["absent"] += 1
+        # The presence bitmaps also cover months moved to the archive
+        presence = attendance_service.presence
+        present = presence.count(start_date, None, ["present"])
+        late = presence.count(start_date, None, ["late"])
+        # For trends: distinct students per status and day
+        trends = presence.daily_counts(start_date)
 
-        present = len(present_ids)
-        late = len(late_ids)
         absent = total_students - present
         total_attendance = (present / total_students * 100) if total_students else 0
 
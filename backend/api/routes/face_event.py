@@ -1,5 +1,6 @@
 from fastapi import APIRouter, UploadFile, File, Form
 import os
+from backend.config import settings
 
 router = APIRouter()
 
@@ -9,8 +10,8 @@ async def receive_face_event(
     confidence: float = Form(...),
     image: UploadFile = File(...)
 ):
-    os.makedirs("backend/received_faces", exist_ok=True)
-    file_location = f"backend/received_faces/face_{timestamp}.jpg"
+    os.makedirs(settings.SNAPSHOT_DIR, exist_ok=True)
+    file_location = os.path.join(settings.SNAPSHOT_DIR, f"face_{timestamp}.jpg")
     with open(file_location, "wb") as f:
         f.write(await image.read())
     return {"status": "success", "file": file_location} 
\ No newline at end of file
@@ -17,6 +17,29 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./attendance.db"
+    DATABASE_ECHO: bool = True
+    
+    # Retention: records older than RETENTION_DAYS are moved to monthly archives
+    ARCHIVE_DIR: str = "backend/archive"
+    RETENTION_DAYS: int = 180
+    ARCHIVE_CHUNK_SIZE: int = 5000
+    
+    # Edge ingest
+    INGEST_MAX_BATCH: int = 500
+    SNAPSHOT_DIR: str = "backend/received_faces"
+    
+    # Admission control for detect_faces and the attendance websocket
+    DETECT_MAX_QUEUE: int = 8
+    DETECT_DEADLINE_SECONDS: float = 1.0
+    DETECT_CLIENT_RATE: float = 5.0  # requests per second per client, 0 disables
+    DETECT_CLIENT_BURST: float = 10.0
+    
+    # Camera ingestion: entries are "camera_id=source" where source is a video
+    # file, a V4L2 device (/dev/video0 or 0) or an RTSP URL
+    CAMERA_SOURCES: List[str] = []
+    CAMERA_MAX_FPS: float = 5.0
+    CAMERA_MAX_FRAME_AGE: float = 1.0
+    CAMERA_SNAPSHOT_INTERVAL: float = 5.0  # seconds between stored detections per camera, 0 disables
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -32,6 +55,7 @@ class Settings(BaseSettings):
     # AI Assistant
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     ASSISTANT_MODEL: str = "gpt-3.5-turbo"
+    ASSISTANT_CACHE_TTL: float = 300.0
     
     class Config:
         case_sensitive = True
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -41,6 +42,21 @@ app.include_router(face_event.router)
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+async def load_presence_index():
+    # Building the index can take seconds on a large table; do it before serving
+    # and off the event loop rather than inside the first request that needs it
+    await asyncio.to_thread(attendance.attendance_service.presence.ensure_loaded)
+
+@app.on_event("startup")
+async def start_camera_ingestion():
+    if settings.CAMERA_SOURCES:
+        await attendance.ingestion_service.start(settings.CAMERA_SOURCES)
+
+@app.on_event("shutdown")
+async def stop_camera_ingestion():
+    await attendance.ingestion_service.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI Attendance System API"}
@@ -48,6 +64,8 @@ async def root():
 # Add new endpoint for attendance cleanup
 @app.get("/api/attendance/cleanup")
 async def cleanup_attendance():
+    presence = attendance.attendance_service.presence
+    presence.ensure_loaded()
     db = SessionLocal()
     try:
         # Get all attendance records ordered by user and timestamp
@@ -68,14 +86,20 @@ async def cleanup_attendance():
         
         # Keep only the first record in each window and delete the rest
         deleted_count = 0
+        affected = set()
         for window_records in windows.values():
             if len(window_records) > 1:
                 # Keep the first record, delete the rest
                 for record in window_records[1:]:
                     db.delete(record)
+                    affected.add((record.user_id, record.timestamp.date()))
                     deleted_count += 1
         
+        # A deleted duplicate may have been the user's only record with its status that day
+        db.flush()
+        pending = presence.restage(db, affected)
         db.commit()
+        presence.apply(pending)
         return {"message": f"Cleaned up {deleted_count} duplicate attendance records"}
     except Exception as e:
         db.rollback()
@@ -99,9 +123,14 @@ async def cleanup_user_attendance(db: Session, user_id: int, timestamp: datetime
         
         # If there are multiple records, keep only the first one
         if len(records) > 1:
+            presence = attendance.attendance_service.presence
+            affected = {(user_id, record.timestamp.date()) for record in records[1:]}
             for record in records[1:]:
                 db.delete(record)
+            db.flush()
+            pending = presence.restage(db, affected)
             db.commit()
+            presence.apply(pending)
             return len(records) - 1
         return 0
     except Exception as e:
@@ -124,8 +153,12 @@ async def record_attendance_endpoint(request: RecordAttendanceRequest):
             confidence=request.confidence,
             timestamp=now
         )
+        presence = attendance.attendance_service.presence
+        presence.ensure_loaded()
         db.add(new_record)
+        pending = presence.stage(db, [(user_id, now, request.confidence)])
         db.commit()
+        presence.apply(pending)
         
         # Clean up any duplicates for this user in the same time window
         cleaned_count = await cleanup_user_attendance(db, user_id, now)
@@ -28,8 +28,34 @@ class AttendanceRecord(Base):
     confidence = Column(Float)
     user = relationship('User', back_populates='attendance_records')
 
+class IngestedEvent(Base):
+    """Edge events received through the batch ingest endpoint, keyed by the client's event ID"""
+    __tablename__ = 'ingested_events'
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(64), unique=True, index=True, nullable=False)
+    camera_id = Column(String(64), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+    confidence = Column(Float, nullable=True)
+    attendance_record_id = Column(Integer, nullable=True)
+    snapshot_path = Column(String(255), nullable=True)
+    received_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class PresenceSlot(Base):
+    """Dense bit position assigned to each user in the presence bitmaps"""
+    __tablename__ = 'presence_slots'
+    user_id = Column(Integer, primary_key=True)
+    slot = Column(Integer, unique=True, nullable=False)
+
+class PresenceBitmap(Base):
+    """zlib-compressed bitmap of the users seen on one day with one status"""
+    __tablename__ = 'presence_bitmaps'
+    day = Column(String(10), primary_key=True)  # ISO date
+    status = Column(String(10), primary_key=True)  # present / late / absent
+    bitmap = Column(LargeBinary, nullable=False)
+
 # Database engine and session
-engine = create_engine(settings.DATABASE_URL, echo=True, future=True)
+engine = create_engine(settings.DATABASE_URL, echo=settings.DATABASE_ECHO, future=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create tables
@@ -0,0 +1,47 @@
+"""Move attendance records older than the retention horizon into monthly archives.
+
+Intended to run periodically (e.g. nightly from cron):
+    python backend/scripts/archive_attendance.py --retention-days 180 --vacuum
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.models import SessionLocal, engine
+from backend.services.retention import AttendanceArchive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old attendance records")
+    parser.add_argument("--retention-days", type=int, default=settings.RETENTION_DAYS,
+                        help="Records older than this many days are archived")
+    parser.add_argument("--chunk-size", type=int, default=settings.ARCHIVE_CHUNK_SIZE,
+                        help="Rows moved and deleted per transaction")
+    parser.add_argument("--archive-dir", default=settings.ARCHIVE_DIR)
+    parser.add_argument("--vacuum", action="store_true",
+                        help="Compact the database file afterwards (locks it while running)")
+    args = parser.parse_args()
+
+    archive = AttendanceArchive(args.archive_dir)
+    db = SessionLocal()
+    try:
+        moved = archive.apply_retention(db, args.retention_days, args.chunk_size)
+        print(f"Archived {moved} attendance records older than {args.retention_days} days to {archive.archive_dir}")
+    finally:
+        db.close()
+
+    if args.vacuum and moved:
+        # Deleted pages are reused by new inserts anyway; VACUUM also gives
+        # the space back to the filesystem
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        print("Database vacuumed")
+
+
+if __name__ == "__main__":
+    main()
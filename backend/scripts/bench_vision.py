@@ -0,0 +1,212 @@
+"""Benchmark the face detection/recognition pipeline on a replayable frame corpus.
+
+Frames are read from a directory of images (for example the captures saved in
+backend/received_faces) or from a local video file, encoded once as base64 JPEG
+like the API receives them, and replayed through FaceRecognitionService while
+sweeping batch size, thread count and input resolution.
+
+Example:
+    python backend/scripts/bench_vision.py backend/received_faces \
+        --batch-sizes 1,4,8 --threads 1,2,4 --resolutions native,640,320 \
+        --output bench/vision.json
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Never let ultralytics reach out to the network while benchmarking
+os.environ.setdefault("YOLO_OFFLINE", "1")
+
+import cv2
+
+from backend.config import settings
+from backend.scripts.bench_utils import current_rss_mb, peak_rss_mb, run_metadata, summarize_latencies, write_json
+from backend.services.face_recognition import FaceRecognitionService
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+STAGES = ("decode", "detect", "embed", "total")
+
+
+def load_frames(source, max_frames):
+    """Load frames from a directory of images or a video file"""
+    frames = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = cv2.imread(os.path.join(source, name), cv2.IMREAD_COLOR)
+            if img is not None:
+                frames.append(img)
+            if len(frames) >= max_frames:
+                break
+    else:
+        capture = cv2.VideoCapture(source)
+        try:
+            while len(frames) < max_frames:
+                ok, img = capture.read()
+                if not ok:
+                    break
+                frames.append(img)
+        finally:
+            capture.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {source}")
+    return frames
+
+
+def resize_frame(img, resolution):
+    """Resize to the given width keeping the aspect ratio ('native' keeps the frame as is)"""
+    if resolution == "native":
+        return img
+    width = int(resolution)
+    height = max(1, round(img.shape[0] * width / img.shape[1]))
+    return cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def encode_frames(frames, resolution):
+    """Encode frames as base64 JPEG, matching what clients post to the API"""
+    encoded = []
+    for img in frames:
+        ok, buf = cv2.imencode(".jpg", resize_frame(img, resolution))
+        if ok:
+            encoded.append(base64.b64encode(buf.tobytes()).decode("ascii"))
+    return encoded
+
+
+def set_threads(count):
+    cv2.setNumThreads(count)
+    try:
+        import torch
+        torch.set_num_threads(count)
+    except ImportError:
+        pass
+
+
+def run_config(service, payloads, batch_size, warmup):
+    """Replay payloads in batches and collect per-stage latencies (seconds per batch)"""
+    batches = [payloads[i:i + batch_size] for i in range(0, len(payloads), batch_size)]
+    for batch in batches[:warmup]:
+        service.detect_faces_in_images([service.decode_image(p) for p in batch])
+
+    latencies = {stage: [] for stage in STAGES}
+    rss_before = current_rss_mb()
+    frame_count = 0
+    started = time.perf_counter()
+    for batch in batches:
+        t0 = time.perf_counter()
+        images = [service.decode_image(p) for p in batch]
+        t1 = time.perf_counter()
+        service.detect_faces_in_images(images)
+        t2 = time.perf_counter()
+        for img in images:
+            service.get_face_embedding_from_image(img)
+        t3 = time.perf_counter()
+        latencies["decode"].append(t1 - t0)
+        latencies["detect"].append(t2 - t1)
+        latencies["embed"].append(t3 - t2)
+        latencies["total"].append(t3 - t0)
+        frame_count += len(batch)
+    elapsed = time.perf_counter() - started
+    rss_after = current_rss_mb()
+
+    return {
+        "frames": frame_count,
+        "batches": len(batches),
+        "elapsed_s": elapsed,
+        "fps": frame_count / elapsed if elapsed else 0.0,
+        "latency_per_batch": {stage: summarize_latencies(latencies[stage]) for stage in STAGES},
+        # ru_maxrss is a process-wide high-water mark, so per configuration only
+        # the change in current RSS is meaningful; the peak is reported per run
+        "rss_mb": rss_after,
+        "rss_delta_mb": rss_after - rss_before if rss_after is not None else None,
+    }
+
+
+def config_key(result):
+    return (result["batch_size"], result["threads"], str(result["resolution"]))
+
+
+def load_baseline(baseline_path):
+    with open(baseline_path) as f:
+        return {config_key(r): r for r in json.load(f)["results"]}
+
+
+def compare_with_baseline(results, baseline, baseline_path):
+    """Print the fps change of every configuration against a previous result file"""
+    print(f"\nComparison with {baseline_path}:")
+    for result in results:
+        previous = baseline.get(config_key(result))
+        if not previous or not previous["fps"]:
+            continue
+        change = (result["fps"] - previous["fps"]) / previous["fps"] * 100
+        print(f"  batch={result['batch_size']} threads={result['threads']} "
+              f"resolution={result['resolution']}: {previous['fps']:.2f} -> {result['fps']:.2f} fps ({change:+.1f}%)")
+
+
+def parse_int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the vision pipeline on a replayable frame corpus")
+    parser.add_argument("source", help="Directory of images or a local video file")
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=parse_int_list, default=[1, 4, 8])
+    parser.add_argument("--threads", type=parse_int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--resolutions", default="native,640,320",
+                        help="Comma-separated frame widths, 'native' keeps the original size")
+    parser.add_argument("--warmup", type=int, default=2, help="Warm-up batches per configuration")
+    parser.add_argument("--detection-model", default=settings.FACE_DETECTION_MODEL_PATH)
+    parser.add_argument("--recognition-model", default=settings.FACE_RECOGNITION_MODEL_PATH)
+    parser.add_argument("--output", default="bench/vision.json")
+    parser.add_argument("--baseline", help="Previous result file to compare against")
+    args = parser.parse_args()
+
+    # Read the baseline up front: it may be the file this run is about to overwrite
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    frames = load_frames(args.source, args.max_frames)
+    resolutions = [r.strip() for r in args.resolutions.split(",") if r.strip()]
+    print(f"Loaded {len(frames)} frames from {args.source}")
+
+    service = FaceRecognitionService(args.recognition_model, args.detection_model)
+
+    results = []
+    for resolution in resolutions:
+        payloads = encode_frames(frames, resolution)
+        for threads in args.threads:
+            set_threads(threads)
+            for batch_size in args.batch_sizes:
+                result = run_config(service, payloads, batch_size, args.warmup)
+                result.update({"batch_size": batch_size, "threads": threads, "resolution": resolution})
+                results.append(result)
+                total = result["latency_per_batch"]["total"]
+                print(f"resolution={resolution} threads={threads} batch={batch_size}: "
+                      f"{result['fps']:.2f} fps, p50={total['p50_ms']:.1f}ms "
+                      f"p95={total['p95_ms']:.1f}ms p99={total['p99_ms']:.1f}ms"
+                      + (f", RSS {result['rss_mb']:.0f} MiB ({result['rss_delta_mb']:+.0f})"
+                         if result["rss_mb"] is not None else ""))
+
+    write_json(args.output, {
+        "meta": run_metadata(
+            benchmark="vision",
+            source=os.path.abspath(args.source),
+            frames=len(frames),
+            detection_model=args.detection_model,
+            recognition_model=args.recognition_model,
+            peak_rss_mb=peak_rss_mb(),
+        ),
+        "results": results,
+    })
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        compare_with_baseline(results, baseline, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Load-test the attendance API with a configurable request mix.
+
+By default the FastAPI app is started in-process (uvicorn on a free local port)
+against the SQLite file given with --db, typically one produced by seed_db.py.
+Pass --url to drive an already running server instead.
+
+Example:
+    python backend/scripts/seed_db.py --db loadtest.db --students 10000
+    python backend/scripts/load_test.py --db loadtest.db --concurrency 32 \
+        --duration 60 --mix record=60,history=20,dashboard_stats=15,attendance_report=4,all=1 \
+        --output bench/load.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import aiohttp
+
+from backend.scripts.bench_utils import run_metadata, summarize_latencies, write_json
+
+DEFAULT_MIX = "record=60,history=20,dashboard_stats=15,attendance_report=4,all=1"
+
+
+def build_request(endpoint, rng, user_ids, report_period):
+    """Return (method, path, json_body) for one request to the given endpoint"""
+    if endpoint == "record":
+        body = {"user_id": str(rng.choice(user_ids)), "confidence": round(rng.uniform(0.7, 0.99), 3)}
+        return "POST", "/api/attendance/record", body
+    if endpoint == "history":
+        return "GET", f"/api/attendance/history/{rng.choice(user_ids)}", None
+    if endpoint == "dashboard_stats":
+        return "GET", "/api/attendance/dashboard_stats", None
+    if endpoint == "attendance_report":
+        return "GET", f"/api/attendance/attendance_report?period={report_period}", None
+    if endpoint == "all":
+        return "GET", "/api/attendance/all", None
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+def parse_mix(value):
+    """Parse 'record=60,history=20' into {endpoint: weight}"""
+    mix = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        endpoint, _, weight = part.partition("=")
+        mix[endpoint.strip()] = float(weight or 1)
+    for endpoint in mix:
+        build_request(endpoint, random.Random(), [1], "week")
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_process_server(db_path):
+    """Start the FastAPI app with uvicorn in a background thread and return (url, server)"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    os.environ.setdefault("DATABASE_ECHO", "false")
+    import uvicorn
+    from backend.main import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("In-process server failed to start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}", server
+
+
+async def fetch_user_ids(session, base_url):
+    async with session.get(f"{base_url}/api/attendance/students") as response:
+        response.raise_for_status()
+        payload = await response.json()
+    user_ids = [student["id"] for student in payload["data"]]
+    if not user_ids:
+        raise SystemExit("No students found, seed the database first")
+    return user_ids
+
+
+async def worker(worker_id, session, base_url, endpoints, weights, user_ids, report_period, deadline, samples, errors):
+    rng = random.Random(worker_id)
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(endpoints, weights)[0]
+        method, path, body = build_request(endpoint, rng, user_ids, report_period)
+        started = time.perf_counter()
+        try:
+            async with session.request(method, base_url + path, json=body) as response:
+                await response.read()
+                ok = response.status < 400
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            ok = False
+        samples[endpoint].append(time.perf_counter() - started)
+        if not ok:
+            errors[endpoint] += 1
+
+
+async def run_load(base_url, mix, concurrency, duration, report_period, timeout):
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+    samples = {e: [] for e in endpoints}
+    errors = {e: 0 for e in endpoints}
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        user_ids = await fetch_user_ids(session, base_url)
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*[
+            worker(i, session, base_url, endpoints, weights, user_ids, report_period, deadline, samples, errors)
+            for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    per_endpoint = {}
+    for endpoint in endpoints:
+        per_endpoint[endpoint] = {
+            "requests": len(samples[endpoint]),
+            "errors": errors[endpoint],
+            "throughput_rps": len(samples[endpoint]) / elapsed if elapsed else 0.0,
+            "latency": summarize_latencies(samples[endpoint]),
+        }
+    total_requests = sum(len(s) for s in samples.values())
+    return {
+        "elapsed_s": elapsed,
+        "students": len(user_ids),
+        "total_requests": total_requests,
+        "total_errors": sum(errors.values()),
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "endpoints": per_endpoint,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the attendance API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--db", default="loadtest.db", help="SQLite file to serve with an in-process server")
+    target.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help="Comma-separated endpoint=weight pairs")
+    parser.add_argument("--report-period", default="month", choices=["week", "month", "all"])
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="bench/load.json")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        base_url, server = start_in_process_server(args.db)
+    try:
+        result = asyncio.run(run_load(base_url, args.mix, args.concurrency, args.duration,
+                                      args.report_period, args.timeout))
+    finally:
+        if server:
+            server.should_exit = True
+
+    for endpoint, stats in result["endpoints"].items():
+        latency = stats["latency"]
+        print(f"{endpoint:>18}: {stats['requests']:>7} req {stats['throughput_rps']:8.1f} req/s "
+              f"p50={latency['p50_ms']:.1f}ms p95={latency['p95_ms']:.1f}ms p99={latency['p99_ms']:.1f}ms "
+              f"errors={stats['errors']}")
+    print(f"Total: {result['total_requests']} requests, {result['throughput_rps']:.1f} req/s")
+
+    write_json(args.output, {
+        "meta": run_metadata(
+            benchmark="load",
+            target=args.url or os.path.abspath(args.db),
+            concurrency=args.concurrency,
+            duration_s=args.duration,
+            mix=args.mix,
+            report_period=args.report_period,
+        ),
+        "results": result,
+    })
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Rebuild the per-day presence bitmaps from attendance_records and the archive.
+
+The index is kept up to date on every insert and built automatically the first
+time it is needed; run this after changing attendance data outside the API
+(bulk imports, manual deletes, cleanup.py). Slot assignments are preserved,
+but a running server keeps its in-memory bitmaps: restart it afterwards.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.models import SessionLocal
+from backend.services.presence import PresenceIndex
+from backend.services.retention import AttendanceArchive
+
+
+def main():
+    index = PresenceIndex(AttendanceArchive())
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        index.rebuild(db)
+        print(f"Rebuilt {len(index.bitmaps)} bitmaps for {len(index.slots)} users "
+              f"in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
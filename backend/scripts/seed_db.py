@@ -0,0 +1,157 @@
+"""Bulk-generate users and attendance records into a SQLite file for load testing.
+
+Students get an individual attendance propensity and arrival habit, so the
+generated check-ins look like a real term: most students arrive shortly before
+the start of class, some drift in late, a few are often absent, and cameras
+occasionally report the same student several times within a few minutes.
+Confidence follows the status thresholds used by the API (>= 0.9 present,
+>= 0.7 late).
+
+Example (10k students, a year of school days, ~10M rows):
+    python backend/scripts/seed_db.py --db loadtest.db --students 10000 \
+        --days 365 --detections-per-visit 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+FIRST_STUDENT_ID = 2100000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+def create_schema(db_path):
+    """Create the application tables in the target database"""
+    # backend.models creates its tables on import using DATABASE_URL
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+    os.environ.setdefault("DATABASE_ECHO", "false")
+    import backend.models  # noqa: F401
+
+
+def school_days(end_day, days, include_weekends):
+    """School days in the `days` calendar days ending at end_day, oldest first"""
+    start_day = end_day - timedelta(days=days - 1)
+    current = start_day
+    while current <= end_day:
+        if include_weekends or current.weekday() < 5:
+            yield current
+        current += timedelta(days=1)
+
+
+def generate_students(rng, count):
+    """Return (user_id, name, attendance_probability, mean_arrival_minutes)"""
+    students = []
+    for i in range(count):
+        user_id = FIRST_STUDENT_ID + i
+        # Most students attend almost every day, a tail is frequently absent
+        attendance_probability = min(0.99, max(0.3, rng.betavariate(8, 1.2)))
+        # Minutes relative to class start, negative means early
+        mean_arrival = rng.gauss(-8, 6)
+        students.append((user_id, f"Student {user_id}", attendance_probability, mean_arrival))
+    return students
+
+
+def generate_day(rng, day, students, class_start_hour, detections_per_visit):
+    """Yield (user_id, timestamp, confidence) rows for one school day"""
+    class_start = datetime.combine(day, datetime.min.time()) + timedelta(hours=class_start_hour)
+    for user_id, _, attendance_probability, mean_arrival in students:
+        if rng.random() > attendance_probability:
+            continue
+        arrival = rng.gauss(mean_arrival, 7)
+        if rng.random() < 0.03:
+            # Occasional very late arrival (traffic, appointments)
+            arrival += rng.expovariate(1 / 45)
+        late = arrival > 10
+        timestamp = class_start + timedelta(minutes=arrival, seconds=rng.random() * 60)
+        # Repeated detections of the same visit while the student stays in view
+        detections = 1
+        if detections_per_visit > 1:
+            detections += int(rng.expovariate(1 / (detections_per_visit - 1)))
+        for _ in range(detections):
+            if late:
+                confidence = rng.uniform(0.7, 0.9)
+            else:
+                confidence = rng.uniform(0.9, 0.995)
+            # A few low-confidence detections end up marked absent
+            if rng.random() < 0.01:
+                confidence = rng.uniform(0.5, 0.7)
+            yield user_id, timestamp.strftime(TIMESTAMP_FORMAT), round(confidence, 4)
+            timestamp += timedelta(seconds=rng.expovariate(1 / 40))
+
+
+def seed(db_path, student_count, days, end_day, detections_per_visit, class_start_hour,
+         include_weekends, chunk_size, seed_value):
+    rng = random.Random(seed_value)
+    create_schema(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        # Durability is irrelevant for a throwaway load-test database
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+
+        students = generate_students(rng, student_count)
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (id, name) VALUES (?, ?)",
+            [(user_id, name) for user_id, name, _, _ in students]
+        )
+        conn.commit()
+        print(f"Seeded {student_count} students")
+
+        started = time.perf_counter()
+        total = 0
+        chunk = []
+        for day in school_days(end_day, days, include_weekends):
+            for row in generate_day(rng, day, students, class_start_hour, detections_per_visit):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    conn.executemany(
+                        "INSERT INTO attendance_records (user_id, timestamp, confidence) VALUES (?, ?, ?)",
+                        chunk
+                    )
+                    conn.commit()
+                    total += len(chunk)
+                    chunk = []
+            print(f"{day.isoformat()}: {total + len(chunk)} attendance records so far")
+        if chunk:
+            conn.executemany(
+                "INSERT INTO attendance_records (user_id, timestamp, confidence) VALUES (?, ?, ?)",
+                chunk
+            )
+            conn.commit()
+            total += len(chunk)
+        # Drop any existing presence index so the API rebuilds it, seeded rows included
+        conn.execute("DELETE FROM presence_bitmaps")
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        print(f"Seeded {total} attendance records in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a SQLite database with synthetic attendance data")
+    parser.add_argument("--db", default="loadtest.db", help="SQLite file to create or extend")
+    parser.add_argument("--students", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=180, help="Calendar days of history to generate")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="Last day of generated history (YYYY-MM-DD)")
+    parser.add_argument("--detections-per-visit", type=float, default=3.0,
+                        help="Mean number of camera detections per student visit")
+    parser.add_argument("--class-start-hour", type=float, default=8.0)
+    parser.add_argument("--include-weekends", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    seed(args.db, args.students, args.days, args.end_date, args.detections_per_visit,
+         args.class_start_hour, args.include_weekends, args.chunk_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being queued"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Face detection overloaded ({reason}), retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take one token; return 0 on success or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Bounded, deadline-aware admission in front of the face detector.
+
+    Requests are rejected up front when a client exceeds its rate limit, when
+    the wait queue is full, or when the estimated queueing delay (from a
+    moving average of service time) would exceed the deadline. An idle
+    detector always admits, so a single slow call cannot inflate the average
+    into permanent rejection. Requests that still wait past their deadline are
+    dropped once they reach the front, so the detector only spends time on
+    frames that are still fresh.
+
+    Every caller of the detector must go through run(): work submitted to the
+    executor directly is invisible to the queueing estimate.
+    """
+
+    def __init__(self, max_in_flight: int = 1, max_queue: int = 8, deadline: float = 1.0,
+                 client_rate: float = 5.0, client_burst: float = 10.0,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="detector")
+        self._semaphore = None
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.in_flight = 0
+        self.queued = 0
+        # Initial guess until real service times are measured
+        self.avg_service_time = 0.1
+        self.counters = {
+            "admitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "shed_rate_limited": 0,
+            "shed_queue_full": 0,
+            "shed_deadline": 0,
+            "expired_in_queue": 0,
+        }
+
+    def estimated_wait(self) -> float:
+        """Expected queueing delay for a request admitted now"""
+        return (self.queued + self.in_flight) / self.max_in_flight * self.avg_service_time
+
+    def _check_rate(self, client_id: str, now: float):
+        if not self.client_rate:
+            return
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                # Forget clients that have been idle long enough to be full again
+                idle = self.client_burst / self.client_rate
+                self._buckets = {c: b for c, b in self._buckets.items() if now - b.updated < idle}
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+        wait = bucket.take(now)
+        if wait:
+            self.counters["shed_rate_limited"] += 1
+            raise Overloaded("rate_limited", wait)
+
+    async def run(self, client_id: str, fn: Callable, *args, deadline: float = None,
+                  rate_limit: bool = True) -> Any:
+        """Run fn(*args) on the detector executor, or raise Overloaded.
+
+        Internal callers with their own pacing (e.g. camera ingestion) pass
+        rate_limit=False; they are still queued and shed like any client.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        arrived = time.monotonic()
+        if rate_limit:
+            self._check_rate(client_id, arrived)
+
+        if self.queued >= self.max_queue:
+            self.counters["shed_queue_full"] += 1
+            raise Overloaded("queue_full", self.estimated_wait())
+        idle = self.queued == 0 and self.in_flight < self.max_in_flight
+        if not idle and self.estimated_wait() > deadline:
+            self.counters["shed_deadline"] += 1
+            raise Overloaded("deadline", self.estimated_wait())
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.counters["admitted"] += 1
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            started = time.monotonic()
+            if started - arrived > deadline:
+                # Waited too long; the result would be stale by now
+                self.counters["expired_in_queue"] += 1
+                raise Overloaded("deadline", self.estimated_wait())
+            self.in_flight += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+            except Exception:
+                self.counters["failed"] += 1
+                raise
+            finally:
+                self.in_flight -= 1
+                elapsed = time.monotonic() - started
+                self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * elapsed
+            self.counters["completed"] += 1
+            return result
+        finally:
+            self._semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "deadline_s": self.deadline,
+            "avg_service_time_ms": round(self.avg_service_time * 1000, 1),
+            "estimated_wait_ms": round(self.estimated_wait() * 1000, 1),
+            **self.counters,
+        }
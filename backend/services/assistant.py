@@ -0,0 +1,404 @@
+import re
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import aiohttp
+from sqlalchemy import func
+from backend.config import settings
+from backend.models import SessionLocal, User
+from backend.services.presence import ATTENDED
+
+HELP_TEXT = (
+    "I can answer attendance questions such as \"Who was absent today?\", "
+    "\"What is the attendance rate this month?\", \"What is 2104720's attendance rate?\" "
+    "or \"Show the late trend this week\"."
+)
+
+
+class Intent(NamedTuple):
+    name: str
+    params: Tuple[Tuple[str, Any], ...]
+
+    def get(self, key, default=None):
+        return dict(self.params).get(key, default)
+
+
+def parse_period(question: str, today: date = None):
+    """Return (start, end, label) for the period mentioned in the question"""
+    today = today or date.today()
+    text = question.lower()
+    match = re.search(r"\b(?:last|past)\s+(\d+)\s+days?\b", text)
+    if match:
+        days = int(match.group(1))
+        return today - timedelta(days=days - 1), today, f"the last {days} days"
+    if re.search(r"\btoday\b", text):
+        return today, today, "today"
+    if "yesterday" in text:
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday, "yesterday"
+    if "last week" in text:
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=6), "last week"
+    if "week" in text:
+        return today - timedelta(days=today.weekday()), today, "this week"
+    if "month" in text:
+        return today.replace(day=1), today, "this month"
+    if re.search(r"\byear\b", text):
+        return today.replace(month=1, day=1), today, "this year"
+    if re.search(r"\b(term|semester|overall|all time|ever)\b", text):
+        return None, today, "overall"
+    return None
+
+
+class IntentParser:
+    """Maps common staff questions to pre-aggregated attendance queries.
+
+    Anything that does not match a known pattern returns None and is left to
+    the language model.
+    """
+
+    STUDENT_ID = re.compile(r"\b(\d{5,})\b")
+    STUDENT_NAMES = (
+        # "Malak Ali's attendance"
+        re.compile(r"\b([A-Z][\w-]*(?:\s+[A-Z][\w-]*)*)'s\b"),
+        # "rate for Malak Ali", "how often does Malak Ali attend"
+        re.compile(r"\b(?i:for|of|does|did|is|was|has)\s+([A-Z][\w-]*(?:\s+[A-Z][\w-]*)*)"),
+    )
+
+    # Dates, periods, groupings, negations and thresholds the parser has no
+    # query for; answering without them would silently answer a different question
+    UNSUPPORTED = re.compile(
+        r"\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+        r"january|february|march|april|june|july|august|september|october|november|december|"
+        r"class|grade|section|course|subject|room|group|teacher|"
+        r"between|since|before|after|until|ago)\b"
+        r"|\b(?:in|on|of|for|during)\s+may\b|\bmay\s+\d"
+        r"|\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}/\d{1,2}(?:/\d{2,4})?\b"
+        r"|\blast\s+(?:month|year|term|semester)\b"
+        r"|(?:\bnot|n't)\s+(?:been\s+)?(?:absent|late|missing)\b|\bnever\b"
+        r"|\bin\s+a\s+row\b|\bconsecutive|\b(?:more|less|fewer)\s+than\b|\bat\s+least\s+(?!once\b)\w"
+        r"|\b(?:most|fewest|lowest|highest|best|worst|top|bottom)\b"
+    )
+
+    def parse(self, question: str, today: date = None) -> Optional[Intent]:
+        today = today or date.today()
+        text = question.lower().strip()
+        if self.UNSUPPORTED.search(text):
+            return None
+        period = parse_period(question, today)
+        student = self._student_reference(question)
+        wants_list = re.search(r"\b(who|list|which students|how many)\b", text)
+
+        if re.search(r"\b(absent|missing|not (?:here|present|in)|didn'?t (?:come|attend|show))\b", text):
+            start, end, label = period or (today, today, "today")
+            if student:
+                return Intent("student_present", (("student", student), ("start", start), ("end", end), ("label", label)))
+            return Intent("absent", (("start", start), ("end", end), ("label", label)))
+
+        if re.search(r"\blate\b|\blateness\b|\btardi", text):
+            if student:
+                start, end, label = period or (today, today, "today")
+                return Intent("student_late", (("student", student), ("start", start), ("end", end), ("label", label)))
+            if wants_list:
+                start, end, label = period or (today, today, "today")
+                return Intent("late", (("start", start), ("end", end), ("label", label)))
+            start, end, label = period or (today - timedelta(days=today.weekday()), today, "this week")
+            return Intent("late_trend", (("start", start), ("end", end), ("label", label)))
+
+        if re.search(r"\b(rate|percentage|how often|streak|attendance (?:of|for)|record)\b", text) or "'s attendance" in text:
+            start, end, label = period or (None, today, "overall")
+            if student:
+                return Intent("student_rate", (("student", student), ("start", start), ("end", end), ("label", label)))
+            if re.search(r"\brate|percentage\b", text):
+                return Intent("attendance_rate", (("start", start), ("end", end), ("label", label)))
+
+        if re.search(r"\b(present|here|attended|came|showed up)\b", text):
+            start, end, label = period or (today, today, "today")
+            if student:
+                return Intent("student_present", (("student", student), ("start", start), ("end", end), ("label", label)))
+            return Intent("present", (("start", start), ("end", end), ("label", label)))
+
+        return None
+
+    def _student_reference(self, question: str) -> Optional[str]:
+        match = self.STUDENT_ID.search(question)
+        if match:
+            return match.group(1)
+        for pattern in self.STUDENT_NAMES:
+            for match in pattern.finditer(question):
+                name = match.group(1).strip()
+                # Skip question words that happen to start a sentence
+                if name.split()[0].lower() not in {"who", "what", "how", "show", "when", "which", "is", "did", "list"}:
+                    return name
+        return None
+
+
+class LLMClient:
+    """Interface for the model used for questions the intent parser cannot answer"""
+
+    async def complete(self, system_prompt: str, question: str) -> str:
+        raise NotImplementedError
+
+
+class OpenAIChatClient(LLMClient):
+    def __init__(self, api_key: str = None, model: str = None, timeout: float = 30.0):
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.model = model or settings.ASSISTANT_MODEL
+        self.timeout = timeout
+
+    async def complete(self, system_prompt: str, question: str) -> str:
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": question},
+            ],
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            async with session.post("https://api.openai.com/v1/chat/completions", json=payload, headers=headers) as response:
+                response.raise_for_status()
+                body = await response.json()
+        return body["choices"][0]["message"]["content"]
+
+
+class StubLLMClient(LLMClient):
+    """Offline stand-in that returns a fixed reply and remembers the questions it got"""
+
+    def __init__(self, reply: str = "I don't know."):
+        self.reply = reply
+        self.calls = []
+
+    async def complete(self, system_prompt: str, question: str) -> str:
+        self.calls.append((system_prompt, question))
+        return self.reply
+
+
+class AssistantService:
+    """Answers staff questions locally where possible, falling back to the model.
+
+    Recognised intents are answered from the presence bitmaps and the users
+    table. Results are cached until the presence index changes (i.e. a new
+    check-in), the day rolls over, or the entry is older than the TTL.
+    """
+
+    def __init__(self, presence, llm_client: Optional[LLMClient] = None, parser: IntentParser = None,
+                 cache_ttl: float = 300.0):
+        self.presence = presence
+        self.llm_client = llm_client
+        self.parser = parser or IntentParser()
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Intent, Tuple[float, Dict[str, Any]]] = {}
+        self._cache_key = None
+        self.stats = {"local": 0, "cache_hits": 0, "llm": 0, "unanswered": 0}
+
+    async def answer(self, question: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        intent = self.parser.parse(question)
+        if intent is None:
+            result = await self._fallback(question)
+        else:
+            result = self._answer_locally(intent)
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def _answer_locally(self, intent: Intent) -> Dict[str, Any]:
+        self.presence.ensure_loaded()
+        # A new check-in or a new day invalidates every cached answer
+        cache_key = (self.presence.version, date.today())
+        if cache_key != self._cache_key:
+            self._cache = {}
+            self._cache_key = cache_key
+        cached = self._cache.get(intent)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            self.stats["cache_hits"] += 1
+            return dict(cached[1], source="cache")
+
+        db = SessionLocal()
+        try:
+            handler = getattr(self, f"_intent_{intent.name}")
+            answer, data = handler(db, intent)
+        finally:
+            db.close()
+        result = {"answer": answer, "intent": intent.name, "data": data}
+        self._cache[intent] = (time.monotonic(), result)
+        self.stats["local"] += 1
+        return dict(result, source="local")
+
+    async def _fallback(self, question: str) -> Dict[str, Any]:
+        if self.llm_client is None:
+            self.stats["unanswered"] += 1
+            return {"answer": HELP_TEXT, "intent": None, "data": None, "source": "local"}
+        self.stats["llm"] += 1
+        reply = await self.llm_client.complete(self._system_prompt(), question)
+        return {"answer": reply, "intent": None, "data": None, "source": "llm"}
+
+    def _system_prompt(self) -> str:
+        # Only a compact summary is sent, never raw attendance rows
+        today = date.today()
+        db = SessionLocal()
+        try:
+            total = db.query(User).count()
+        finally:
+            db.close()
+        present = self.presence.count(today, today, ["present"])
+        late = self.presence.count(today, today, ["late"])
+        return (
+            "You are the assistant of a school attendance system. Answer briefly. "
+            f"Today is {today.isoformat()}. There are {total} registered students; "
+            f"{present} were present on time today and {late} arrived late."
+        )
+
+    # Intent handlers return (answer text, structured data)
+
+    def _users(self, db) -> Dict[int, str]:
+        return dict(db.query(User.id, User.name).all())
+
+    def _no_school(self, intent) -> bool:
+        return not self.presence.days(intent.get("start"), intent.get("end"))
+
+    def _intent_absent(self, db, intent):
+        if self._no_school(intent):
+            return f"No attendance was recorded {intent.get('label')}.", {"count": 0, "students": []}
+        users = self._users(db)
+        # Low-confidence sightings have the "absent" status, so only present/late count as attending
+        seen = set(self.presence.user_ids(self.presence.union(intent.get("start"), intent.get("end"), ATTENDED)))
+        absent = sorted((name, user_id) for user_id, name in users.items() if user_id not in seen)
+        label = intent.get("label")
+        data = {"count": len(absent), "students": [{"id": user_id, "name": name} for name, user_id in absent]}
+        if not absent:
+            return f"Nobody was absent {label}.", data
+        return f"{len(absent)} of {len(users)} students were absent {label}: {self._names(absent)}.", data
+
+    def _intent_present(self, db, intent):
+        if self._no_school(intent):
+            return f"No attendance was recorded {intent.get('label')}.", {"count": 0, "students": []}
+        users = self._users(db)
+        seen = self.presence.user_ids(self.presence.union(intent.get("start"), intent.get("end"), ATTENDED))
+        present = sorted((users[user_id], user_id) for user_id in seen if user_id in users)
+        label = intent.get("label")
+        data = {"count": len(present), "students": [{"id": user_id, "name": name} for name, user_id in present]}
+        if not present:
+            return f"No students attended {label}.", data
+        return f"{len(present)} of {len(users)} students attended {label}: {self._names(present)}.", data
+
+    def _intent_student_present(self, db, intent):
+        student = self._find_student(db, intent.get("student"))
+        if student is None:
+            return f"I couldn't find a student matching \"{intent.get('student')}\".", None
+        user_id, name = student
+        attended, days = self.presence.attended_days(user_id, intent.get("start"), intent.get("end"))
+        label = intent.get("label")
+        data = {"student": {"id": user_id, "name": name}, "attended_days": attended, "school_days": days}
+        if not days:
+            return f"No attendance was recorded {label}.", data
+        if days == 1:
+            return f"{name} ({user_id}) {'attended' if attended else 'did not attend'} {label}.", data
+        return f"{name} ({user_id}) attended {attended} of {days} school days {label}.", data
+
+    def _intent_student_late(self, db, intent):
+        student = self._find_student(db, intent.get("student"))
+        if student is None:
+            return f"I couldn't find a student matching \"{intent.get('student')}\".", None
+        user_id, name = student
+        late, days = self.presence.attended_days(user_id, intent.get("start"), intent.get("end"), ["late"])
+        label = intent.get("label")
+        data = {"student": {"id": user_id, "name": name}, "late_days": late, "school_days": days}
+        if not days:
+            return f"No attendance was recorded {label}.", data
+        if days == 1:
+            return f"{name} ({user_id}) {'was' if late else 'was not'} late {label}.", data
+        return f"{name} ({user_id}) was late on {late} of {days} school days {label}.", data
+
+    def _intent_late(self, db, intent):
+        if self._no_school(intent):
+            return f"No attendance was recorded {intent.get('label')}.", {"count": 0, "students": []}
+        users = self._users(db)
+        seen = self.presence.user_ids(self.presence.union(intent.get("start"), intent.get("end"), ["late"]))
+        late = sorted((users[user_id], user_id) for user_id in seen if user_id in users)
+        label = intent.get("label")
+        data = {"count": len(late), "students": [{"id": user_id, "name": name} for name, user_id in late]}
+        if not late:
+            return f"Nobody was late {label}.", data
+        return f"{len(late)} students were late {label}: {self._names(late)}.", data
+
+    def _intent_late_trend(self, db, intent):
+        daily = self.presence.daily_counts(intent.get("start"), intent.get("end"))
+        trend = {day: counts["late"] for day, counts in daily.items()}
+        label = intent.get("label")
+        if not trend:
+            return f"No attendance was recorded {label}.", {"trend": trend}
+        total = sum(trend.values())
+        worst_day = max(trend, key=trend.get)
+        answer = (
+            f"{total} late arrivals {label}, {total / len(trend):.1f} per school day on average; "
+            f"the most were on {worst_day} ({trend[worst_day]})."
+        )
+        return answer, {"trend": trend}
+
+    def _intent_attendance_rate(self, db, intent):
+        users = self._users(db)
+        total = len(users)
+        start, end, label = intent.get("start"), intent.get("end"), intent.get("label")
+        daily = self.presence.daily_counts(start, end)
+        attended_once = sum(
+            1 for user_id in self.presence.user_ids(self.presence.union(start, end, ATTENDED))
+            if user_id in users
+        )
+        if not total or not daily:
+            return f"No attendance was recorded {label}.", {"days": 0}
+        daily_rates = [(counts["present"] + counts["late"]) / total * 100 for counts in daily.values()]
+        average = sum(daily_rates) / len(daily_rates)
+        data = {
+            "days": len(daily),
+            "average_daily_rate": average,
+            "attended_at_least_once": attended_once,
+            "total_students": total,
+        }
+        return (
+            f"Average daily attendance {label} was {average:.1f}% over {len(daily)} school days; "
+            f"{attended_once} of {total} students attended at least once."
+        ), data
+
+    def _intent_student_rate(self, db, intent):
+        student = self._find_student(db, intent.get("student"))
+        if student is None:
+            return f"I couldn't find a student matching \"{intent.get('student')}\".", None
+        user_id, name = student
+        start, end, label = intent.get("start"), intent.get("end"), intent.get("label")
+        attended, days = self.presence.attended_days(user_id, start, end)
+        late, _ = self.presence.attended_days(user_id, start, end, ["late"])
+        streak = self.presence.streak(user_id, end)
+        rate = attended / days * 100 if days else 0
+        data = {
+            "student": {"id": user_id, "name": name},
+            "attended_days": attended,
+            "late_days": late,
+            "school_days": days,
+            "attendance_rate": rate,
+            "current_streak": streak,
+        }
+        return (
+            f"{name} ({user_id}) attended {attended} of {days} school days {label} ({rate:.1f}%), "
+            f"late on {late}; current streak {streak} days."
+        ), data
+
+    def _find_student(self, db, reference: str):
+        if reference.isdigit():
+            user = db.query(User.id, User.name).filter(User.id == int(reference)).first()
+            return tuple(user) if user else None
+        user = db.query(User.id, User.name).filter(func.lower(User.name) == reference.lower()).first()
+        if user:
+            return tuple(user)
+        matches = db.query(User.id, User.name).filter(User.name.ilike(f"%{reference}%")).limit(2).all()
+        return tuple(matches[0]) if len(matches) == 1 else None
+
+    @staticmethod
+    def _names(students: List[Tuple[str, int]], limit: int = 20) -> str:
+        names = ", ".join(name for name, _ in students[:limit])
+        if len(students) > limit:
+            names += f" and {len(students) - limit} more"
+        return names
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, cached_entries=len(self._cache))
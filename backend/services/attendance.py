@@ -1,11 +1,23 @@
+import base64
+import binascii
+import logging
+import os
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Any
-from backend.models import SessionLocal, AttendanceRecord, User
+from sqlalchemy.exc import IntegrityError
+from backend.config import settings
+from backend.models import SessionLocal, AttendanceRecord, User, IngestedEvent
+from backend.services.presence import PresenceIndex, STATUSES
+from backend.services.retention import AttendanceArchive
+
+logger = logging.getLogger(__name__)
 
 class AttendanceService:
     def __init__(self):
         # Initialize the cache for present students
         self.present_students = {}  # Format: {date_str: set(user_ids)}
+        self.archive = AttendanceArchive()
+        self.presence = PresenceIndex(self.archive)
         self.reset_cache()  # Start with a clean cache
     
     def reset_cache(self):
@@ -40,12 +52,18 @@ class AttendanceService:
                 "message": f"Student {user_id} already marked present today"
             }
         
+        self.presence.ensure_loaded()
         db = SessionLocal()
         try:
             # Record attendance in database
-            record = AttendanceRecord(user_id=user_id, confidence=confidence)
+            # Local time, like every other insert path: presence days and
+            # dashboard queries are keyed on the local date
+            record = AttendanceRecord(user_id=user_id, confidence=confidence, timestamp=datetime.now())
             db.add(record)
+            db.flush()
+            pending = self.presence.stage(db, [(user_id, record.timestamp, confidence)])
             db.commit()
+            self.presence.apply(pending)
             
             # Add to cache
             self.present_students[today].add(user_id)
@@ -60,15 +78,153 @@ class AttendanceService:
         finally:
             db.close()
 
+    def ingest_events(self, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store a batch of edge events in a single transaction.
+
+        Each event carries a client-generated event_id; events whose ID has
+        already been ingested are reported as duplicates and not stored again,
+        so clients can safely retry a whole batch after a timeout. Events for
+        user IDs that are not registered are reported as unknown_user and not
+        stored, so they can be resent once the student is registered.
+
+        Raises ValueError, before anything is stored, if a snapshot is not
+        valid base64.
+        """
+        # Decode every snapshot up front so a bad one rejects the batch before
+        # any file is written
+        snapshots = {}
+        for event in events:
+            if event.get("snapshot"):
+                try:
+                    snapshots[event["event_id"]] = base64.b64decode(event["snapshot"], validate=True)
+                except binascii.Error:
+                    raise ValueError(f"Event {event['event_id']}: snapshot is not valid base64")
+
+        self._reset_cache_if_new_day()
+        self.presence.ensure_loaded()
+        db = SessionLocal()
+        try:
+            try:
+                results, newly_present, pending = self._ingest_events(db, events, snapshots)
+            except IntegrityError:
+                # A concurrent batch committed some of the same event IDs first;
+                # retry once so those are picked up as duplicates
+                db.rollback()
+                results, newly_present, pending = self._ingest_events(db, events, snapshots)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # Only update the caches once the batch is committed
+        self.presence.apply(pending)
+        for day, user_id in newly_present:
+            if day in self.present_students:
+                self.present_students[day].add(user_id)
+
+        return {
+            "status": "success",
+            "accepted": sum(1 for r in results if r["status"] not in ("duplicate", "unknown_user")),
+            "duplicates": sum(1 for r in results if r["status"] == "duplicate"),
+            "rejected": sum(1 for r in results if r["status"] == "unknown_user"),
+            "results": results,
+        }
+
+    def _ingest_events(self, db, events, snapshots):
+        event_ids = [event["event_id"] for event in events]
+        seen = {
+            event_id
+            for (event_id,) in db.query(IngestedEvent.event_id).filter(
+                IngestedEvent.event_id.in_(event_ids)
+            )
+        }
+        user_ids = {event["user_id"] for event in events if event.get("user_id") is not None}
+        known_users = {
+            user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))
+        } if user_ids else set()
+
+        results = []
+        newly_present = set()
+        recorded = []
+        files = []
+        for event in events:
+            event_id = event["event_id"]
+            if event_id in seen:
+                results.append({"event_id": event_id, "status": "duplicate"})
+                continue
+            user_id = event.get("user_id")
+            if user_id is not None and user_id not in known_users:
+                results.append({"event_id": event_id, "status": "unknown_user"})
+                continue
+            seen.add(event_id)
+
+            timestamp = event["timestamp"]
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone().replace(tzinfo=None)
+            ingested = IngestedEvent(
+                event_id=event_id,
+                camera_id=event["camera_id"],
+                user_id=user_id,
+                timestamp=timestamp,
+                confidence=event.get("confidence"),
+            )
+            if event_id in snapshots:
+                ingested.snapshot_path = self._snapshot_path(event["camera_id"], event_id)
+                files.append((ingested.snapshot_path, snapshots[event_id]))
+
+            status = "stored"
+            if user_id is not None:
+                day = timestamp.date().isoformat()
+                # Decided from the persisted presence bitmaps rather than the
+                # in-memory cache, which only covers today since the last restart
+                if self.presence.seen(user_id, day) or (day, user_id) in newly_present:
+                    status = "skipped"
+                else:
+                    record = AttendanceRecord(user_id=user_id, confidence=event.get("confidence"), timestamp=timestamp)
+                    db.add(record)
+                    db.flush()
+                    ingested.attendance_record_id = record.id
+                    newly_present.add((day, user_id))
+                    recorded.append((user_id, timestamp, record.confidence))
+                    status = "recorded"
+            db.add(ingested)
+            results.append({"event_id": event_id, "status": status})
+
+        pending = self.presence.stage(db, recorded)
+        # Files are written once all rows are staged and removed again if the
+        # commit fails, so SNAPSHOT_DIR only holds snapshots of stored events
+        written = []
+        try:
+            for path, image in files:
+                self._write_snapshot(path, image)
+                written.append(path)
+            db.commit()
+        except Exception:
+            for path in written:
+                try:
+                    os.remove(path)
+                except OSError:
+                    logger.warning("Could not remove orphaned snapshot %s", path)
+            raise
+        return results, newly_present, pending
+
+    @staticmethod
+    def _snapshot_path(camera_id: str, event_id: str) -> str:
+        return os.path.join(settings.SNAPSHOT_DIR, f"face_{camera_id}_{event_id}.jpg")
+
+    @staticmethod
+    def _write_snapshot(path: str, image: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(image)
+
     def get_attendance_history(self, user_id: int, start_date: datetime = None, end_date: datetime = None) -> List[Dict[str, Any]]:
         db = SessionLocal()
         try:
-            query = db.query(AttendanceRecord).filter(AttendanceRecord.user_id == user_id)
-            if start_date:
-                query = query.filter(AttendanceRecord.timestamp >= start_date)
-            if end_date:
-                query = query.filter(AttendanceRecord.timestamp <= end_date)
-            records = query.order_by(AttendanceRecord.timestamp.desc()).all()
+            # Merges archived months when the range reaches back that far
+            records = self.archive.query_records(db, start_date, end_date, user_id=int(user_id))
+            records.sort(key=lambda record: record.timestamp, reverse=True)
             return [
                 {
                     "timestamp": record.timestamp,
@@ -80,24 +236,18 @@ class AttendanceService:
             db.close()
 
     def get_attendance_statistics(self) -> Dict[str, Any]:
-        """Get attendance statistics using cache for today's attendance"""
-        self._reset_cache_if_new_day()
-        today = date.today().isoformat()
+        """Get attendance statistics from the presence bitmaps"""
+        today = date.today()
         
         db = SessionLocal()
         try:
             total_users = db.query(User).count()
-            # Use cache for today's attendance
-            today_attendance = len(self.present_students[today])
+            # Any recorded sighting counts, whatever its confidence
+            today_attendance = self.presence.count(today, today, STATUSES)
             
-            # For weekly attendance, combine cache and database data
-            week_ago = (date.today() - timedelta(days=7)).isoformat()
-            weekly_attendance = len({
-                user_id
-                for date_str, user_ids in self.present_students.items()
-                for user_id in user_ids
-                if date_str >= week_ago
-            })
+            # Users seen on at least one day of the last week
+            week_ago = today - timedelta(days=7)
+            weekly_attendance = self.presence.count(week_ago, today, STATUSES)
             
             return {
                 "total_users": total_users,
@@ -113,9 +263,7 @@ class AttendanceService:
         db = SessionLocal()
         try:
             # Get attendance by day of week
-            records = db.query(AttendanceRecord).filter(
-                AttendanceRecord.user_id == user_id
-            ).all()
+            records = self.archive.query_records(db, user_id=user_id)
             
             daily_patterns = {}
             for record in records:
@@ -14,30 +14,66 @@ class FaceRecognitionService:
 
     def recognize_face(self, image):
         # Implement face recognition logic here
-        pass 
+        pass
 
-    def detect_faces(self, base64_image: str):
-        # Decode base64 image to NumPy array
+    @staticmethod
+    def decode_image(base64_image: str):
+        """Decode a base64-encoded image into a BGR NumPy array"""
         img_data = base64.b64decode(base64_image)
         np_arr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-        # Run YOLOv8 detection
-        results = self.detector(img)
-        # Extract bounding boxes
-        boxes = []
+        return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+    def detect_faces_in_images(self, images):
+        """Run YOLOv8 detection on a batch of decoded images.
+
+        Returns one list of bounding boxes per input image.
+        """
+        results = self.detector(list(images), verbose=False)
+        batch_boxes = []
         for result in results:
+            boxes = []
             for box in result.boxes.xyxy.cpu().numpy():
                 x1, y1, x2, y2 = box[:4]
                 boxes.append({
                     'x1': int(x1), 'y1': int(y1), 'x2': int(x2), 'y2': int(y2)
                 })
-        return boxes 
+            batch_boxes.append(boxes)
+        return batch_boxes
+
+    def detect_faces(self, base64_image: str):
+        # Decode base64 image to NumPy array
+        img = self.decode_image(base64_image)
+        # Run YOLOv8 detection and extract bounding boxes
+        return self.detect_faces_in_images([img])[0]
+
+    def process_frame(self, frame_data):
+        """Detect and recognise the faces in one websocket frame.
+
+        frame_data is a base64-encoded image, or a dict holding one under
+        "image". Returns (identity, box, confidence) per detected face, with
+        identity None for faces recognize_face() does not match.
+        """
+        image_base64 = frame_data.get("image") if isinstance(frame_data, dict) else frame_data
+        if not image_base64:
+            raise ValueError("Frame has no image")
+        img = self.decode_image(image_base64)
+        if img is None:
+            raise ValueError("Frame image could not be decoded")
+        results = []
+        for box in self.detect_faces_in_images([img])[0]:
+            face = img[max(box['y1'], 0):box['y2'], max(box['x1'], 0):box['x2']]
+            # recognize_face returns (identity, confidence), or None for no match
+            match = self.recognize_face(face) if face.size else None
+            identity, confidence = match if match else (None, 0.0)
+            results.append((identity, box, confidence))
+        return results
 
     def get_face_embedding(self, image_base64: str):
         # Decode base64 image to NumPy array
-        img_data = base64.b64decode(image_base64)
-        np_arr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        img = self.decode_image(image_base64)
+        return self.get_face_embedding_from_image(img)
+
+    def get_face_embedding_from_image(self, img):
         # TODO: Detect face, crop, preprocess, and get embedding using your recognition model
         # For now, return a dummy embedding (e.g., a vector of zeros)
-        return np.zeros(128, dtype=np.float32) 
\ No newline at end of file
+        return np.zeros(128, dtype=np.float32)
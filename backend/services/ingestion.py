@@ -0,0 +1,359 @@
+import asyncio
+import base64
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import cv2
+from backend.services.admission import Overloaded
+
+logger = logging.getLogger(__name__)
+
+
+class LatestFrameSlot:
+    """Single-frame buffer where a newer frame replaces an unconsumed older one.
+
+    Readers never queue more than one frame per camera, so a slow pipeline
+    drops stale frames instead of building up an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._captured_at = None
+        self.replaced = 0
+
+    def put(self, frame, captured_at: float):
+        if self._frame is not None:
+            self.replaced += 1
+        self._frame = frame
+        self._captured_at = captured_at
+
+    def has_frame(self) -> bool:
+        return self._frame is not None
+
+    def take(self):
+        frame, captured_at = self._frame, self._captured_at
+        self._frame = None
+        self._captured_at = None
+        return frame, captured_at
+
+
+def parse_source(spec: str, index: int):
+    """Parse 'camera_id=url' (or a bare url) into (camera_id, url)"""
+    camera_id, sep, url = spec.partition("=")
+    if not sep or "://" in camera_id:
+        return f"camera-{index}", spec
+    return camera_id, url
+
+
+class CameraSource:
+    """One video source (file, V4L2 device or RTSP URL) read on its own thread"""
+
+    def __init__(self, camera_id: str, url: str, max_fps: float, loop_files: bool = True):
+        self.camera_id = camera_id
+        self.url = url
+        self.max_fps = max_fps
+        self.loop_files = loop_files
+        self.is_file = os.path.isfile(url)
+        self.slot = LatestFrameSlot()
+        self.next_due = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._on_frame = None
+        self.stats = {
+            "status": "stopped",
+            "frames_read": 0,
+            "frames_processed": 0,
+            "frames_stale": 0,
+            "frames_shed": 0,
+            "reconnects": 0,
+            "faces_last_frame": 0,
+            "last_latency_ms": None,
+            "last_error": None,
+        }
+        self._processed_times = deque()
+
+    def start(self, loop: asyncio.AbstractEventLoop, on_frame: Callable[[], None]):
+        self._loop = loop
+        self._on_frame = on_frame
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.camera_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: float = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _open(self):
+        # Bare integers select a local device by index (e.g. "0" for /dev/video0)
+        target = int(self.url) if self.url.isdigit() else self.url
+        capture = cv2.VideoCapture(target)
+        if not capture.isOpened():
+            capture.release()
+            raise RuntimeError(f"Could not open video source {self.url}")
+        return capture
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            self.stats["status"] = "connecting"
+            try:
+                capture = self._open()
+            except Exception as e:
+                self.stats["status"] = "reconnecting"
+                self.stats["last_error"] = str(e)
+                self.stats["reconnects"] += 1
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            backoff = 1.0
+            self.stats["status"] = "running"
+            # Files are replayed at their native rate to behave like a live camera
+            frame_interval = 0.0
+            if self.is_file:
+                native_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+                frame_interval = 1.0 / native_fps
+            try:
+                while not self._stop.is_set():
+                    ok, frame = capture.read()
+                    if not ok:
+                        if self.is_file and self.loop_files:
+                            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                            continue
+                        raise RuntimeError(f"Video source {self.url} stopped delivering frames")
+                    self.stats["frames_read"] += 1
+                    self._loop.call_soon_threadsafe(self._publish, frame, time.monotonic())
+                    if frame_interval:
+                        self._stop.wait(frame_interval)
+            except Exception as e:
+                self.stats["status"] = "reconnecting"
+                self.stats["last_error"] = str(e)
+                self.stats["reconnects"] += 1
+                self._stop.wait(backoff)
+            finally:
+                capture.release()
+        self.stats["status"] = "stopped"
+
+    def _publish(self, frame, captured_at: float):
+        self.slot.put(frame, captured_at)
+        self._on_frame()
+
+    def record_processed(self, latency: float, faces: int):
+        now = time.monotonic()
+        self.stats["frames_processed"] += 1
+        self.stats["faces_last_frame"] = faces
+        self.stats["last_latency_ms"] = round(latency * 1000, 1)
+        self._processed_times.append(now)
+        # Keep a short window for the measured processing rate
+        cutoff = now - 5.0
+        while self._processed_times and self._processed_times[0] < cutoff:
+            self._processed_times.popleft()
+
+    def get_stats(self) -> Dict[str, Any]:
+        window = self._processed_times
+        fps = 0.0
+        if len(window) > 1 and window[-1] > window[0]:
+            fps = (len(window) - 1) / (window[-1] - window[0])
+        return {
+            "camera_id": self.camera_id,
+            "url": self.url,
+            "max_fps": self.max_fps,
+            "processing_fps": round(fps, 2),
+            "frames_dropped": self.slot.replaced,
+            **self.stats,
+        }
+
+
+class DetectionRecorder:
+    """Result handler that stores camera detections as edge events.
+
+    Every face crop becomes an ingested event with its snapshot saved in
+    SNAPSHOT_DIR, using the same path as POST /ingest. Face recognition is
+    not implemented yet, so events carry no user_id and do not record
+    attendance. At most one frame per camera is stored every min_interval
+    seconds, and storage runs off the event loop.
+    """
+
+    def __init__(self, attendance_service, min_interval: float = 5.0):
+        self.attendance_service = attendance_service
+        self.min_interval = min_interval
+        self._last_stored: Dict[str, float] = {}
+        self.stored = 0
+
+    def __call__(self, camera_id: str, frame, boxes: List[Dict[str, int]], captured_at: float):
+        if not boxes or self.min_interval <= 0:
+            return
+        if captured_at - self._last_stored.get(camera_id, float("-inf")) < self.min_interval:
+            return
+        self._last_stored[camera_id] = captured_at
+        # captured_at is monotonic; convert it to wall-clock time for the event
+        timestamp = datetime.now() - timedelta(seconds=time.monotonic() - captured_at)
+        events = []
+        for index, box in enumerate(boxes):
+            crop = frame[max(box["y1"], 0):box["y2"], max(box["x1"], 0):box["x2"]]
+            ok, buf = cv2.imencode(".jpg", crop) if crop.size else (False, None)
+            if not ok:
+                continue
+            events.append({
+                "event_id": f"{camera_id}-{timestamp:%Y%m%d%H%M%S%f}-{index}",
+                "camera_id": camera_id,
+                "timestamp": timestamp,
+                "snapshot": base64.b64encode(buf.tobytes()).decode("ascii"),
+            })
+        if events:
+            future = asyncio.get_running_loop().run_in_executor(None, self._store, events)
+            future.add_done_callback(self._log_failure)
+
+    def _store(self, events):
+        self.attendance_service.ingest_events(events)
+        self.stored += len(events)
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception():
+            logger.error("Storing camera detections failed", exc_info=future.exception())
+
+
+class IngestionService:
+    """Reads N camera sources and feeds their freshest frames to the face pipeline.
+
+    Each camera keeps only its latest frame. A single inference loop takes the
+    latest frame from every camera that is due under its fps cap, discards
+    frames older than max_frame_age, and runs them through the shared
+    FaceRecognitionService as one batch on a dedicated worker thread. When
+    inference falls behind, frames are dropped rather than queued, so the
+    capture-to-result latency stays bounded by roughly one batch.
+
+    When the detector is shared with other callers, pass their
+    AdmissionController: batches then queue alongside API requests (as client
+    "ingestion", without a rate limit) and are shed like them under overload.
+    """
+
+    CLIENT_ID = "ingestion"
+
+    def __init__(self, face_recognition_service, max_fps: float = 5.0, max_frame_age: float = 1.0,
+                 on_result: Optional[Callable] = None, admission=None):
+        self.face_recognition_service = face_recognition_service
+        self.max_fps = max_fps
+        self.max_frame_age = max_frame_age
+        # Called as on_result(camera_id, frame, boxes, captured_at) for every processed frame
+        self.on_result = on_result
+        self.sources: Dict[str, CameraSource] = {}
+        self.admission = admission
+        self._executor = None if admission else ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-inference")
+        self._frame_available = None
+        self._task = None
+
+    def add_source(self, camera_id: str, url: str, max_fps: float = None):
+        if camera_id in self.sources:
+            raise ValueError(f"Camera {camera_id} is already registered")
+        source = CameraSource(camera_id, url, max_fps or self.max_fps)
+        self.sources[camera_id] = source
+        if self._task:
+            source.start(asyncio.get_running_loop(), self._frame_available.set)
+        return source
+
+    async def start(self, source_specs: List[str] = ()):
+        if self._task:
+            return
+        self._frame_available = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for index, spec in enumerate(source_specs):
+            camera_id, url = parse_source(spec, index)
+            self.sources.setdefault(camera_id, CameraSource(camera_id, url, self.max_fps))
+        for source in self.sources.values():
+            source.start(loop, self._frame_available.set)
+        self._task = asyncio.create_task(self._inference_loop())
+        logger.info("Ingestion started for cameras: %s", ", ".join(self.sources) or "none")
+
+    async def stop(self):
+        for source in self.sources.values():
+            source.stop()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for source in self.sources.values():
+            await asyncio.to_thread(source.join, 5.0)
+
+    def _collect_due_frames(self, now: float):
+        """Take the latest frame from every camera allowed to process one now"""
+        batch = []
+        for source in self.sources.values():
+            if now < source.next_due or not source.slot.has_frame():
+                continue
+            frame, captured_at = source.slot.take()
+            if now - captured_at > self.max_frame_age:
+                source.stats["frames_stale"] += 1
+                continue
+            source.next_due = now + 1.0 / source.max_fps
+            batch.append((source, frame, captured_at))
+        return batch
+
+    def _next_due_in(self, now: float) -> Optional[float]:
+        pending = [s.next_due - now for s in self.sources.values() if s.slot.has_frame()]
+        return max(0.0, min(pending)) if pending else None
+
+    async def _inference_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._frame_available.clear()
+            now = time.monotonic()
+            batch = self._collect_due_frames(now)
+            if not batch:
+                # Sleep until a new frame arrives or a capped camera becomes due
+                try:
+                    await asyncio.wait_for(self._frame_available.wait(), self._next_due_in(now))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            frames = [frame for _, frame, _ in batch]
+            detect = self.face_recognition_service.detect_faces_in_images
+            try:
+                if self.admission:
+                    # The oldest frame in the batch bounds how long it may wait
+                    oldest = min(captured_at for _, _, captured_at in batch)
+                    results = await self.admission.run(
+                        self.CLIENT_ID, detect, frames,
+                        deadline=max(0.0, self.max_frame_age - (now - oldest)), rate_limit=False
+                    )
+                else:
+                    results = await loop.run_in_executor(self._executor, detect, frames)
+            except Overloaded:
+                for source, _, _ in batch:
+                    source.stats["frames_shed"] += 1
+                continue
+            except Exception as e:
+                logger.exception("Face detection failed")
+                for source, _, _ in batch:
+                    source.stats["last_error"] = str(e)
+                continue
+
+            done = time.monotonic()
+            for (source, frame, captured_at), boxes in zip(batch, results):
+                source.record_processed(done - captured_at, len(boxes))
+                if self.on_result:
+                    try:
+                        self.on_result(source.camera_id, frame, boxes, captured_at)
+                    except Exception:
+                        logger.exception("Result handler failed for camera %s", source.camera_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "max_frame_age_s": self.max_frame_age,
+            "cameras": [source.get_stats() for source in self.sources.values()],
+        }
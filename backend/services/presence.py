@@ -0,0 +1,278 @@
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from backend.models import SessionLocal, AttendanceRecord, PresenceBitmap, PresenceSlot
+
+STATUSES = ("present", "late", "absent")
+ATTENDED = ("present", "late")
+
+
+def attendance_status(confidence: float) -> str:
+    """Map a recognition confidence to the status shown on the dashboard"""
+    if confidence is None:
+        return "absent"
+    if confidence >= 0.9:
+        return "present"
+    if confidence >= 0.7:
+        return "late"
+    return "absent"
+
+
+def _encode(bits: int) -> bytes:
+    return zlib.compress(bits.to_bytes((bits.bit_length() + 7) // 8, "little"))
+
+
+def _decode(data: bytes) -> int:
+    return int.from_bytes(zlib.decompress(data), "little")
+
+
+def popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def _day_key(value) -> str:
+    return value if isinstance(value, str) else value.isoformat()
+
+
+class PresenceIndex:
+    """Per-day, per-status bitmaps of which users were seen.
+
+    Every user gets a dense slot (bit position); each (day, status) pair is a
+    Python int used as a bitset and persisted zlib-compressed in the
+    presence_bitmaps table. Range questions ("attended at least once this
+    term", daily trends, streaks) become OR/AND/popcount over a handful of
+    integers instead of scans over attendance_records.
+
+    The index is loaded lazily and rebuilt from attendance_records (and any
+    archived months) when nothing has been persisted yet, e.g. after seeding.
+    """
+
+    def __init__(self, archive=None):
+        self.archive = archive
+        self.slots: Dict[int, int] = {}
+        self.users_by_slot: List[int] = []
+        self.bitmaps: Dict[Tuple[str, str], int] = {}
+        # Bumped on every change so derived results can be cached against it
+        self.version = 0
+        self._loaded = False
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        db = SessionLocal()
+        try:
+            self.load(db)
+        finally:
+            db.close()
+
+    def load(self, db):
+        """Load the persisted index, rebuilding it if it was never built"""
+        slots = db.query(PresenceSlot.user_id, PresenceSlot.slot).all()
+        rows = db.query(PresenceBitmap.day, PresenceBitmap.status, PresenceBitmap.bitmap).all()
+        if not rows and db.query(AttendanceRecord.id).first() is not None:
+            self.rebuild(db)
+            return
+        self._set_slots({user_id: slot for user_id, slot in slots})
+        self.bitmaps = {(day, status): _decode(bitmap) for day, status, bitmap in rows}
+        self._loaded = True
+
+    def _set_slots(self, slots: Dict[int, int]):
+        self.slots = slots
+        self.users_by_slot = [None] * (max(slots.values()) + 1 if slots else 0)
+        for user_id, slot in slots.items():
+            self.users_by_slot[slot] = user_id
+
+    def rebuild(self, db):
+        """Recompute every bitmap from attendance_records and the archive.
+
+        Existing slot assignments are kept and new users are appended, so a
+        server that loaded the index earlier still maps bits to the same users.
+        """
+        slots = {user_id: slot for user_id, slot in db.query(PresenceSlot.user_id, PresenceSlot.slot)}
+        known = set(slots)
+        next_slot = max(slots.values()) + 1 if slots else 0
+        bitmaps = {}
+
+        def add(user_id, timestamp, confidence):
+            nonlocal next_slot
+            if user_id is None or timestamp is None:
+                return
+            slot = slots.get(user_id)
+            if slot is None:
+                slot = slots[user_id] = next_slot
+                next_slot += 1
+            key = (timestamp.date().isoformat(), attendance_status(confidence))
+            bitmaps[key] = bitmaps.get(key, 0) | (1 << slot)
+
+        hot = db.query(
+            AttendanceRecord.user_id, AttendanceRecord.timestamp, AttendanceRecord.confidence
+        ).execution_options(yield_per=50000)
+        for user_id, timestamp, confidence in hot:
+            add(user_id, timestamp, confidence)
+        if self.archive:
+            for record in self.archive.iter_records():
+                add(record.user_id, record.timestamp, record.confidence)
+
+        try:
+            db.query(PresenceBitmap).delete()
+            db.bulk_save_objects([PresenceSlot(user_id=u, slot=s) for u, s in slots.items() if u not in known])
+            db.bulk_save_objects([
+                PresenceBitmap(day=day, status=status, bitmap=_encode(bits))
+                for (day, status), bits in bitmaps.items()
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        self._set_slots(slots)
+        self.bitmaps = bitmaps
+        self.version += 1
+        self._loaded = True
+
+    def stage(self, db, entries: Iterable[Tuple[int, object, float]]) -> dict:
+        """Write the bitmaps touched by (user_id, timestamp, confidence) entries into db's transaction.
+
+        Returns the pending in-memory changes; pass them to apply() once the
+        transaction has committed. Call ensure_loaded() before opening the
+        transaction, since loading may have to rebuild the index.
+        """
+        new_slots = {}
+        changed = {}
+        for user_id, timestamp, confidence in entries:
+            slot = self.slots.get(user_id)
+            if slot is None:
+                slot = new_slots.get(user_id)
+            if slot is None:
+                slot = len(self.users_by_slot) + len(new_slots)
+                new_slots[user_id] = slot
+                db.add(PresenceSlot(user_id=user_id, slot=slot))
+            key = (timestamp.date().isoformat(), attendance_status(confidence))
+            bits = changed.get(key, self.bitmaps.get(key, 0))
+            changed[key] = bits | (1 << slot)
+        changed = {key: bits for key, bits in changed.items() if bits != self.bitmaps.get(key, 0)}
+        for (day, status), bits in changed.items():
+            db.merge(PresenceBitmap(day=day, status=status, bitmap=_encode(bits)))
+        return {"slots": new_slots, "bitmaps": changed}
+
+    def restage(self, db, user_days: Iterable[Tuple[int, object]]) -> dict:
+        """Recompute the bits of (user_id, day) pairs from attendance_records in db's transaction.
+
+        Used after deleting records, which stage() cannot express: each user's
+        bit is set for exactly the statuses of their remaining records that
+        day. Flush the deletes first; like stage(), pass the result to apply()
+        after committing.
+        """
+        by_day = {}
+        for user_id, day in user_days:
+            if user_id in self.slots:
+                by_day.setdefault(_day_key(day), set()).add(user_id)
+
+        changed = {}
+        for day, user_ids in by_day.items():
+            start = datetime.fromisoformat(day)
+            remaining = {}
+            user_list = sorted(user_ids)
+            # Keep the IN list below SQLite's bound parameter limit
+            for i in range(0, len(user_list), 500):
+                rows = db.query(AttendanceRecord.user_id, AttendanceRecord.confidence).filter(
+                    AttendanceRecord.user_id.in_(user_list[i:i + 500]),
+                    AttendanceRecord.timestamp >= start,
+                    AttendanceRecord.timestamp < start + timedelta(days=1)
+                )
+                for user_id, confidence in rows:
+                    remaining.setdefault(user_id, set()).add(attendance_status(confidence))
+            for status in STATUSES:
+                bits = self.bitmaps.get((day, status), 0)
+                for user_id in user_ids:
+                    mask = 1 << self.slots[user_id]
+                    bits = bits | mask if status in remaining.get(user_id, ()) else bits & ~mask
+                if bits != self.bitmaps.get((day, status), 0):
+                    changed[(day, status)] = bits
+                    db.merge(PresenceBitmap(day=day, status=status, bitmap=_encode(bits)))
+        return {"slots": {}, "bitmaps": changed}
+
+    def apply(self, pending: dict):
+        if not pending["slots"] and not pending["bitmaps"]:
+            # Nothing changed (duplicates, snapshot-only events); keep derived caches
+            return
+        for user_id, slot in pending["slots"].items():
+            self.slots[user_id] = slot
+            self.users_by_slot.append(user_id)
+        self.bitmaps.update(pending["bitmaps"])
+        self.version += 1
+
+    def days(self, start=None, end=None) -> List[str]:
+        """Days with any recorded attendance in [start, end], ascending"""
+        self.ensure_loaded()
+        first = _day_key(start) if start else None
+        last = _day_key(end) if end else None
+        return sorted({
+            day for day, _ in self.bitmaps
+            if (first is None or day >= first) and (last is None or day <= last)
+        })
+
+    def union(self, start=None, end=None, statuses: Iterable[str] = ATTENDED) -> int:
+        """Bitmap of users seen with any of the statuses on any day in [start, end]"""
+        self.ensure_loaded()
+        bits = 0
+        for day in self.days(start, end):
+            for status in statuses:
+                bits |= self.bitmaps.get((day, status), 0)
+        return bits
+
+    def count(self, start=None, end=None, statuses: Iterable[str] = ATTENDED) -> int:
+        return popcount(self.union(start, end, statuses))
+
+    def user_ids(self, bits: int) -> List[int]:
+        """User IDs whose bits are set"""
+        return [
+            self.users_by_slot[slot]
+            for slot, bit in enumerate(reversed(bin(bits)[2:]))
+            if bit == "1"
+        ]
+
+    def seen(self, user_id: int, day, statuses: Iterable[str] = STATUSES) -> bool:
+        """Whether the user has any of the statuses recorded on day"""
+        self.ensure_loaded()
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return False
+        day = _day_key(day)
+        return any(self.bitmaps.get((day, status), 0) >> slot & 1 for status in statuses)
+
+    def daily_counts(self, start=None, end=None) -> Dict[str, Dict[str, int]]:
+        """Number of distinct users per status for each day in [start, end]"""
+        self.ensure_loaded()
+        return {
+            day: {status: popcount(self.bitmaps.get((day, status), 0)) for status in STATUSES}
+            for day in self.days(start, end)
+        }
+
+    def attended_days(self, user_id: int, start=None, end=None, statuses: Iterable[str] = ATTENDED) -> Tuple[int, int]:
+        """(days the user attended, days with any attendance) in [start, end]"""
+        self.ensure_loaded()
+        slot = self.slots.get(user_id)
+        days = self.days(start, end)
+        if slot is None:
+            return 0, len(days)
+        mask = 1 << slot
+        attended = sum(
+            1 for day in days
+            if any(self.bitmaps.get((day, status), 0) & mask for status in statuses)
+        )
+        return attended, len(days)
+
+    def streak(self, user_id: int, end: Optional[date] = None, statuses: Iterable[str] = ATTENDED) -> int:
+        """Consecutive school days (days with any attendance) attended up to end"""
+        self.ensure_loaded()
+        slot = self.slots.get(user_id)
+        if slot is None:
+            return 0
+        mask = 1 << slot
+        streak = 0
+        for day in reversed(self.days(end=end or date.today())):
+            if not any(self.bitmaps.get((day, status), 0) & mask for status in statuses):
+                break
+            streak += 1
+        return streak
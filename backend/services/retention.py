@@ -0,0 +1,194 @@
+import csv
+import gzip
+import os
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func
+from backend.config import settings
+from backend.models import AttendanceRecord
+
+# Same attributes as AttendanceRecord so callers can treat both alike
+ArchivedRecord = namedtuple("ArchivedRecord", ["id", "user_id", "timestamp", "confidence"])
+
+
+def _month_key(value) -> str:
+    return value.strftime("%Y-%m")
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+class AttendanceArchive:
+    """Cold storage for old attendance records.
+
+    Records are stored as gzip-compressed CSV files, one partition per month
+    (attendance_records/YYYY-MM.csv.gz). Chunks are appended as separate gzip
+    members, which gzip readers concatenate transparently.
+    """
+
+    def __init__(self, archive_dir: str = None):
+        self.archive_dir = os.path.join(archive_dir or settings.ARCHIVE_DIR, "attendance_records")
+
+    def partition_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"{month}.csv.gz")
+
+    def months(self) -> List[str]:
+        """Archived months in ascending order"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        return sorted(
+            name[:-len(".csv.gz")]
+            for name in os.listdir(self.archive_dir)
+            if name.endswith(".csv.gz")
+        )
+
+    def _recorded_horizon(self) -> Optional[datetime]:
+        try:
+            with open(os.path.join(self.archive_dir, "horizon.txt")) as f:
+                return datetime.fromisoformat(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def horizon(self) -> Optional[datetime]:
+        """Records older than this have been moved to the archive (None if nothing is archived)"""
+        recorded = self._recorded_horizon()
+        if recorded is not None:
+            return recorded
+        months = self.months()
+        if not months:
+            return None
+        # Archives written before the horizon was recorded: end of the last archived month
+        year, month = map(int, months[-1].split("-"))
+        return datetime(year + month // 12, month % 12 + 1, 1)
+
+    def _set_horizon(self, cutoff: datetime):
+        current = self._recorded_horizon()
+        if current is not None and current >= cutoff:
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, "horizon.txt"), "w") as f:
+            f.write(cutoff.isoformat())
+
+    def months_in_range(self, start: datetime = None, end: datetime = None) -> List[str]:
+        """Archived months overlapping [start, end]"""
+        first = _month_key(start) if start else None
+        last = _month_key(end) if end else None
+        return [
+            month for month in self.months()
+            if (first is None or month >= first) and (last is None or month <= last)
+        ]
+
+    def _append(self, month: str, records):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with gzip.open(self.partition_path(month), "at", newline="") as f:
+            writer = csv.writer(f)
+            for record in records:
+                writer.writerow([
+                    record.id,
+                    record.user_id,
+                    record.timestamp.isoformat(),
+                    record.confidence,
+                ])
+
+    def archive_before(self, db, cutoff: datetime, chunk_size: int = None) -> int:
+        """Move hot records older than cutoff into the archive, chunk by chunk.
+
+        Each chunk is written to its month partitions before it is deleted from
+        the hot table, so an interrupted run never loses records; rows archived
+        twice are de-duplicated by id when read back.
+        """
+        chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+        # Always keep the newest row hot: SQLite reuses ids once the table is
+        # empty, which would collide with ids already in the archive
+        max_id = db.query(func.max(AttendanceRecord.id)).scalar()
+        if max_id is None:
+            return 0
+        moved = 0
+        while True:
+            records = db.query(AttendanceRecord).filter(
+                AttendanceRecord.timestamp < cutoff,
+                AttendanceRecord.id < max_id
+            ).order_by(AttendanceRecord.id).limit(chunk_size).all()
+            if not records:
+                break
+
+            by_month = {}
+            for record in records:
+                by_month.setdefault(_month_key(record.timestamp), []).append(record)
+            for month, month_records in by_month.items():
+                self._append(month, month_records)
+
+            ids = [record.id for record in records]
+            try:
+                db.query(AttendanceRecord).filter(
+                    AttendanceRecord.id.in_(ids)
+                ).delete(synchronize_session=False)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            db.expunge_all()
+            moved += len(ids)
+        if moved:
+            self._set_horizon(cutoff)
+        return moved
+
+    def apply_retention(self, db, retention_days: int = None, chunk_size: int = None) -> int:
+        """Archive everything older than the retention horizon"""
+        retention_days = settings.RETENTION_DAYS if retention_days is None else retention_days
+        cutoff = datetime.combine(date.today() - timedelta(days=retention_days), datetime.min.time())
+        return self.archive_before(db, cutoff, chunk_size)
+
+    def read(self, start: datetime = None, end: datetime = None, user_id: Optional[int] = None) -> List[ArchivedRecord]:
+        """Read archived records with start <= timestamp <= end"""
+        return list(self.iter_records(start, end, user_id))
+
+    def iter_records(self, start: datetime = None, end: datetime = None, user_id: Optional[int] = None):
+        """Stream archived records with start <= timestamp <= end, one month at a time"""
+        start = _as_datetime(start)
+        end = _as_datetime(end)
+        seen = set()
+        for month in self.months_in_range(start, end):
+            with gzip.open(self.partition_path(month), "rt", newline="") as f:
+                for row in csv.reader(f):
+                    record_id = int(row[0])
+                    record_user_id = int(row[1])
+                    if record_id in seen or (user_id is not None and record_user_id != user_id):
+                        continue
+                    timestamp = datetime.fromisoformat(row[2])
+                    if (start and timestamp < start) or (end and timestamp > end):
+                        continue
+                    seen.add(record_id)
+                    yield ArchivedRecord(record_id, record_user_id, timestamp, float(row[3]))
+
+    def query_records(self, db, start=None, end=None, user_id: Optional[int] = None) -> list:
+        """Attendance records from the hot table merged with any overlapping archives.
+
+        Archives are only opened when an explicit start is given and the range
+        reaches back into an archived month. Open-ended queries stay on the hot
+        table (the retention horizon), since scanning every archived month to
+        find one user would be slower than the table scan archiving replaced;
+        callers report horizon() so clients can tell such results are partial.
+        """
+        start = _as_datetime(start)
+        end = _as_datetime(end)
+        query = db.query(AttendanceRecord)
+        if user_id is not None:
+            query = query.filter(AttendanceRecord.user_id == user_id)
+        if start:
+            query = query.filter(AttendanceRecord.timestamp >= start)
+        if end:
+            query = query.filter(AttendanceRecord.timestamp <= end)
+        records = query.all()
+
+        if start is not None and self.months_in_range(start, end):
+            hot_ids = {record.id for record in records}
+            records.extend(
+                record for record in self.read(start, end, user_id)
+                if record.id not in hot_ids
+            )
+        return records
@@ -0,0 +1,26 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Point the app at a throwaway database before backend.models creates its engine
+_db_dir = tempfile.mkdtemp(prefix="attendance-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["DATABASE_ECHO"] = "false"
+os.environ["ARCHIVE_DIR"] = os.path.join(_db_dir, "archive")
+
+
+@pytest.fixture(autouse=True)
+def empty_database():
+    """Every test starts from empty tables"""
+    from backend.models import Base, SessionLocal
+    db = SessionLocal()
+    try:
+        for table in reversed(Base.metadata.sorted_tables):
+            db.execute(table.delete())
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.services.admission import AdmissionController, Overloaded
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_idle_detector_admits_after_a_slow_call():
+    controller = AdmissionController(deadline=1.0, client_rate=0)
+    # A cold start pushes the service time average past the deadline
+    controller.avg_service_time = 5.0
+
+    async def scenario():
+        return [await controller.run("client", time.sleep, 0.01) for _ in range(20)]
+
+    run(scenario())
+    assert controller.counters["completed"] == 20
+    assert controller.counters["shed_deadline"] == 0
+    assert controller.avg_service_time < 0.1
+
+
+def test_requests_beyond_the_deadline_are_shed():
+    controller = AdmissionController(deadline=0.25, client_rate=0, max_queue=50)
+    controller.avg_service_time = 0.1
+
+    async def scenario():
+        return await asyncio.gather(
+            *[controller.run("client", time.sleep, 0.1) for _ in range(10)], return_exceptions=True
+        )
+
+    results = run(scenario())
+    shed = [r for r in results if isinstance(r, Overloaded)]
+    assert len(shed) == controller.counters["shed_deadline"] > 0
+    assert controller.counters["completed"] == 10 - len(shed)
+    assert all(e.reason == "deadline" and int(e.retry_after_header) >= 1 for e in shed)
+
+
+def test_full_queue_is_shed():
+    controller = AdmissionController(deadline=10.0, client_rate=0, max_queue=2)
+
+    async def scenario():
+        return await asyncio.gather(
+            *[controller.run("client", time.sleep, 0.05) for _ in range(5)], return_exceptions=True
+        )
+
+    results = run(scenario())
+    assert [r.reason for r in results if isinstance(r, Overloaded)] == ["queue_full"] * 2
+    assert controller.counters["completed"] == 3
+
+
+def test_requests_that_outwait_their_deadline_are_dropped_before_running():
+    controller = AdmissionController(deadline=0.05, client_rate=0, max_queue=5)
+    controller.avg_service_time = 0.001
+    calls = []
+
+    def work(seconds):
+        calls.append(seconds)
+        time.sleep(seconds)
+
+    async def scenario():
+        return await asyncio.gather(controller.run("a", work, 0.2), controller.run("b", work, 0), return_exceptions=True)
+
+    first, second = run(scenario())
+    assert isinstance(second, Overloaded)
+    assert calls == [0.2]
+    assert controller.counters["expired_in_queue"] == 1
+
+
+def test_rate_limit_is_per_client_and_can_be_bypassed():
+    controller = AdmissionController(client_rate=1.0, client_burst=2.0)
+
+    async def scenario():
+        for _ in range(2):
+            await controller.run("camera-host", int)
+        with pytest.raises(Overloaded) as shed:
+            await controller.run("camera-host", int)
+        assert shed.value.reason == "rate_limited"
+        await controller.run("other-host", int)
+        await controller.run("ingestion", int, rate_limit=False)
+
+    run(scenario())
+    assert controller.counters["shed_rate_limited"] == 1
+    assert controller.counters["completed"] == 4
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from backend.models import SessionLocal, User
+from backend.services.assistant import AssistantService, IntentParser, StubLLMClient
+from backend.services.presence import PresenceIndex
+
+TODAY = date(2025, 5, 7)  # a Wednesday
+
+
+@pytest.fixture
+def parser():
+    return IntentParser()
+
+
+@pytest.fixture
+def students():
+    db = SessionLocal()
+    try:
+        db.query(User).delete()
+        db.add_all([User(id=2100001, name="Malak Ali"), User(id=2100002, name="Omar Said"), User(id=2100003, name="Lina Haddad")])
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def presence(students):
+    """Index where today Malak was present, Omar was only seen at low confidence and Lina was late yesterday"""
+    index = PresenceIndex()
+    index.slots = {2100001: 0, 2100002: 1, 2100003: 2}
+    index.users_by_slot = [2100001, 2100002, 2100003]
+    today = date.today().isoformat()
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    index.bitmaps = {
+        (today, "present"): 0b001,
+        (today, "absent"): 0b010,
+        (yesterday, "present"): 0b011,
+        (yesterday, "late"): 0b100,
+    }
+    index._loaded = True
+    return index
+
+
+def ask(service, question):
+    return asyncio.run(service.answer(question))
+
+
+@pytest.mark.parametrize("question, name", [
+    ("Who was absent today?", "absent"),
+    ("Who came in late yesterday?", "late"),
+    ("Show the late trend this week", "late_trend"),
+    ("Was Student 2100007 late this week?", "student_late"),
+    ("Was Malak Ali absent yesterday?", "student_present"),
+    ("What is 2104720's attendance rate?", "student_rate"),
+    ("What is the attendance rate this month?", "attendance_rate"),
+    ("How many students were late today?", "late"),
+    ("Who attended at least once this week?", "present"),
+])
+def test_parser_intents(parser, question, name):
+    assert parser.parse(question, TODAY).name == name
+
+
+@pytest.mark.parametrize("question, start, end", [
+    ("How many students were late today?", TODAY, TODAY),
+    ("Who was absent yesterday?", TODAY - timedelta(days=1), TODAY - timedelta(days=1)),
+    ("Who was late last week?", date(2025, 4, 28), date(2025, 5, 4)),
+    ("What is the attendance rate this year?", date(2025, 1, 1), TODAY),
+])
+def test_parser_periods(parser, question, start, end):
+    intent = parser.parse(question, TODAY)
+    assert (intent.get("start"), intent.get("end")) == (start, end)
+
+
+def test_parser_keeps_period_and_student(parser):
+    intent = parser.parse("Who came in late yesterday?", TODAY)
+    assert (intent.get("start"), intent.get("end")) == (TODAY - timedelta(days=1),) * 2
+    intent = parser.parse("Was Student 2100007 late this week?", TODAY)
+    assert intent.get("student") == "2100007"
+    assert intent.get("start") == date(2025, 5, 5)
+
+
+@pytest.mark.parametrize("question", [
+    "Who attended on Monday?",
+    "What is the attendance rate of class 10A?",
+    "Who was absent on 2025-05-01?",
+    "How many students were late in May?",
+    "Write a note to the parents of absent students since the holidays",
+    "Who was absent last month?",
+    "Which students were absent 2 weeks ago?",
+    "What was the attendance rate last year?",
+    "What is the attendance rate for May?",
+    "Who was not absent today?",
+    "Who wasn't late this week?",
+    "Who was absent for 3 days in a row?",
+    "Who was late more than 3 times this month?",
+    "Who has the lowest attendance rate?",
+    "Which student was late most often?",
+])
+def test_parser_leaves_unsupported_qualifiers_to_the_model(parser, question):
+    assert parser.parse(question, TODAY) is None
+
+
+def test_unrecognised_questions_go_to_the_model(presence):
+    llm = StubLLMClient("Monday attendance was 2 of 3.")
+    service = AssistantService(presence, llm_client=llm)
+    result = ask(service, "Who attended on Monday?")
+    assert result["source"] == "llm"
+    assert result["answer"] == "Monday attendance was 2 of 3."
+    assert [question for _, question in llm.calls] == ["Who attended on Monday?"]
+    assert service.get_stats()["llm"] == 1
+
+
+def test_local_answers_do_not_call_the_model(presence):
+    llm = StubLLMClient()
+    service = AssistantService(presence, llm_client=llm)
+    result = ask(service, "Was Lina Haddad late yesterday?")
+    assert result["source"] == "local"
+    assert result["data"]["late_days"] == 1
+    assert ask(service, "Was Lina Haddad late yesterday?")["source"] == "cache"
+    assert llm.calls == []
+
+
+def test_low_confidence_sightings_count_as_absent(presence):
+    service = AssistantService(presence, llm_client=StubLLMClient())
+    present = ask(service, "Who was present today?")["data"]
+    absent = ask(service, "Who was absent today?")["data"]
+    assert present["count"] == 1
+    assert {s["id"] for s in absent["students"]} == {2100002, 2100003}
+    assert present["count"] + absent["count"] == 3
+
+
+def test_who_was_late_lists_students(presence):
+    service = AssistantService(presence, llm_client=StubLLMClient())
+    result = ask(service, "Who came in late yesterday?")
+    assert result["intent"] == "late"
+    assert result["data"]["students"] == [{"id": 2100003, "name": "Lina Haddad"}]
+
+
+def test_cache_survives_writes_that_change_nothing(presence):
+    service = AssistantService(presence, llm_client=StubLLMClient())
+    ask(service, "Who was absent today?")
+    # Duplicate-only ingest batches and snapshot-only events stage no changes
+    presence.apply({"slots": {}, "bitmaps": {}})
+    assert ask(service, "Who was absent today?")["source"] == "cache"
+    presence.apply({"slots": {}, "bitmaps": {(date.today().isoformat(), "present"): 0b101}})
+    assert ask(service, "Who was absent today?")["source"] == "local"
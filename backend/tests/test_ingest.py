@@ -0,0 +1,126 @@
+import base64
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from backend.config import settings
+from backend.models import AttendanceRecord, IngestedEvent, SessionLocal, User
+from backend.services.attendance import AttendanceService
+
+SNAPSHOT = base64.b64encode(b"\xff\xd8 not really a jpeg").decode("ascii")
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    return tmp_path / "snapshots"
+
+
+@pytest.fixture
+def service(snapshot_dir):
+    db = SessionLocal()
+    try:
+        db.add_all([User(id=1, name="Malak Ali"), User(id=2, name="Omar Said")])
+        db.commit()
+    finally:
+        db.close()
+    return AttendanceService()
+
+
+def event(event_id, user_id=None, timestamp=None, snapshot=None):
+    return {
+        "event_id": event_id,
+        "camera_id": "gate-1",
+        "timestamp": timestamp or datetime.now(),
+        "user_id": user_id,
+        "confidence": 0.95 if user_id is not None else None,
+        "snapshot": snapshot,
+    }
+
+
+def statuses(response):
+    return [result["status"] for result in response["results"]]
+
+
+def attendance_count():
+    db = SessionLocal()
+    try:
+        return db.query(AttendanceRecord).count()
+    finally:
+        db.close()
+
+
+def test_retried_batch_is_reported_as_duplicates(service):
+    batch = [event("e1", user_id=1), event("e2", snapshot=SNAPSHOT)]
+    assert statuses(service.ingest_events(batch)) == ["recorded", "stored"]
+    retry = service.ingest_events(batch)
+    assert statuses(retry) == ["duplicate", "duplicate"]
+    assert (retry["accepted"], retry["duplicates"]) == (0, 2)
+    assert attendance_count() == 1
+
+
+def test_one_record_per_user_and_day_across_batches_and_restarts(service):
+    yesterday = datetime.now() - timedelta(days=1)
+    assert statuses(service.ingest_events([event("e1", 1, yesterday)])) == ["recorded"]
+    assert statuses(service.ingest_events([event("e2", 1, yesterday + timedelta(minutes=5))])) == ["skipped"]
+    assert statuses(service.ingest_events([event("e3", 1), event("e4", 1)])) == ["recorded", "skipped"]
+    restarted = AttendanceService()
+    assert statuses(restarted.ingest_events([event("e5", 1)])) == ["skipped"]
+    assert attendance_count() == 2
+
+
+def test_unknown_users_are_rejected_without_storing(service):
+    response = service.ingest_events([event("e1", user_id=999), event("e2", user_id=2)])
+    assert statuses(response) == ["unknown_user", "recorded"]
+    assert response["rejected"] == 1
+    assert service.presence.seen(999, datetime.now().date()) is False
+    db = SessionLocal()
+    try:
+        assert db.query(IngestedEvent.event_id).all() == [("e2",)]
+    finally:
+        db.close()
+
+
+def test_invalid_snapshot_rejects_batch_without_writing_files(service, snapshot_dir):
+    batch = [event("e1", user_id=1, snapshot=SNAPSHOT), event("e2", snapshot="not base64!")]
+    with pytest.raises(ValueError):
+        service.ingest_events(batch)
+    assert not snapshot_dir.exists() or os.listdir(snapshot_dir) == []
+    assert attendance_count() == 0
+
+
+def test_snapshots_are_written_for_stored_events(service, snapshot_dir):
+    service.ingest_events([event("e1", snapshot=SNAPSHOT)])
+    db = SessionLocal()
+    try:
+        path = db.query(IngestedEvent.snapshot_path).scalar()
+    finally:
+        db.close()
+    with open(path, "rb") as f:
+        assert f.read() == base64.b64decode(SNAPSHOT)
+
+
+def test_batch_racing_a_concurrent_commit_is_retried(service, monkeypatch):
+    ingest = service._ingest_events
+    calls = []
+
+    def lose_race_once(db, events, snapshots):
+        calls.append(len(events))
+        if len(calls) == 1:
+            # Another worker commits e1 first; our commit hits the unique index
+            other = SessionLocal()
+            try:
+                other.add(IngestedEvent(event_id="e1", camera_id="gate-2", timestamp=datetime.now()))
+                other.commit()
+            finally:
+                other.close()
+            raise IntegrityError("INSERT INTO ingested_events", {}, Exception("UNIQUE constraint failed"))
+        return ingest(db, events, snapshots)
+
+    monkeypatch.setattr(service, "_ingest_events", lose_race_once)
+    response = service.ingest_events([event("e1", user_id=1), event("e2", user_id=2)])
+    assert statuses(response) == ["duplicate", "recorded"]
+    assert calls == [2, 2]
+    assert attendance_count() == 1
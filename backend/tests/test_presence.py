@@ -0,0 +1,109 @@
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from backend.models import AttendanceRecord, PresenceSlot, SessionLocal, User
+from backend.services.attendance import AttendanceService
+from backend.services.presence import PresenceIndex
+from backend.services.retention import AttendanceArchive
+
+TODAY = datetime.combine(date.today(), datetime.min.time()).replace(hour=8)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.add_all([User(id=user_id, name=f"Student {user_id}") for user_id in (1, 2, 3)])
+    session.commit()
+    yield session
+    session.close()
+
+
+def insert(db, index, rows):
+    """Insert (user_id, timestamp, confidence) rows the way the API does"""
+    index.ensure_loaded()
+    records = [AttendanceRecord(user_id=u, timestamp=t, confidence=c) for u, t, c in rows]
+    db.add_all(records)
+    pending = index.stage(db, rows)
+    db.commit()
+    index.apply(pending)
+    return records
+
+
+def members(index):
+    """{(day, status): user IDs}, independent of slot numbering"""
+    return {key: sorted(index.user_ids(bits)) for key, bits in index.bitmaps.items() if bits}
+
+
+def test_staged_inserts_match_a_rebuild(db):
+    index = PresenceIndex()
+    insert(db, index, [(1, TODAY, 0.95), (2, TODAY, 0.75), (2, TODAY - timedelta(days=1), 0.5)])
+    rebuilt = PresenceIndex()
+    rebuilt.rebuild(db)
+    assert members(rebuilt) == members(index)
+    reloaded = PresenceIndex()
+    reloaded.ensure_loaded()
+    assert members(reloaded) == members(index)
+
+
+def test_restage_clears_bits_of_deleted_records(db):
+    index = PresenceIndex()
+    present, late = insert(db, index, [(1, TODAY, 0.95), (1, TODAY + timedelta(minutes=1), 0.75)])
+    assert index.seen(1, TODAY.date(), ["late"])
+    db.delete(late)
+    db.flush()
+    pending = index.restage(db, [(1, TODAY.date())])
+    db.commit()
+    index.apply(pending)
+    assert index.seen(1, TODAY.date(), ["present"])
+    assert not index.seen(1, TODAY.date(), ["late"])
+    rebuilt = PresenceIndex()
+    rebuilt.rebuild(db)
+    assert members(rebuilt) == members(index)
+
+
+def test_rebuild_after_archiving_keeps_slots_of_a_live_index(db, tmp_path):
+    live = PresenceIndex()
+    # User 3 gets slot 0, but once archived its records are read back last
+    insert(db, live, [(3, TODAY - timedelta(days=60), 0.95)])
+    insert(db, live, [(1, TODAY - timedelta(days=1), 0.95), (2, TODAY - timedelta(days=1), 0.95)])
+    archive = AttendanceArchive(str(tmp_path))
+    assert archive.archive_before(db, TODAY - timedelta(days=30)) == 1
+
+    # Offline rebuild in "another process", then a check-in through the live index
+    PresenceIndex(archive).rebuild(db)
+    insert(db, live, [(2, TODAY, 0.95)])
+
+    reloaded = PresenceIndex(archive)
+    reloaded.ensure_loaded()
+    assert reloaded.slots == live.slots
+    assert reloaded.user_ids(reloaded.union(TODAY.date(), TODAY.date())) == [2]
+    assert db.query(PresenceSlot).count() == 3
+
+
+def test_rebuild_appends_slots_for_new_users(db):
+    index = PresenceIndex()
+    insert(db, index, [(2, TODAY, 0.95)])
+    db.add(AttendanceRecord(user_id=1, timestamp=TODAY, confidence=0.95))
+    db.commit()
+    index.rebuild(db)
+    assert index.slots == {2: 0, 1: 1}
+    assert index.count(TODAY.date(), TODAY.date()) == 2
+
+
+@pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+def test_recorded_attendance_uses_local_time(db, monkeypatch):
+    # Twelve hours from UTC, so a UTC timestamp would land on another day for half of it
+    monkeypatch.setenv("TZ", "Etc/GMT+12")
+    time.tzset()
+    try:
+        service = AttendanceService()
+        service.record_attendance(1, 0.95)
+        stored = db.query(AttendanceRecord.timestamp).scalar()
+        assert abs(stored - datetime.now()) < timedelta(minutes=1)
+        assert service.presence.count(date.today(), date.today()) == 1
+        assert service.get_attendance_statistics()["today_attendance"] == 1
+    finally:
+        monkeypatch.undo()
+        time.tzset()